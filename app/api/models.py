@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Optional, Any
 
 class DocumentEmbedRequest(BaseModel):
     document: str = Field(..., description="Path to the document file to be embedded.")
@@ -22,6 +22,7 @@ class UnsuccessfulResponse(BaseModel):
 class Citation(BaseModel):
     page: Optional[Any] = Field(None, description="Page number of the citation. Can be int or N/A")
     document_name: str
+    document_id: Optional[str] = None
 
 class QueryResponseData(BaseModel):
     answer: str
@@ -34,6 +35,128 @@ class QuerySuccessResponse(BaseModel):
 
 class QueryRequest(BaseModel):
     query: str
-    document_id: str
+    document_id: Optional[str] = None
+    document_ids: Optional[List[str]] = Field(None, min_length=1, description="Query several documents at once.")
+    collection: Optional[str] = Field(None, description="Query every document embedded into this collection.")
     require_citations: bool = True
-    conversation_id: Optional[str] = None
\ No newline at end of file
+    conversation_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_single_target(self):
+        targets = [self.document_id, self.document_ids, self.collection]
+        if sum(target is not None for target in targets) != 1:
+            raise ValueError("Provide exactly one of document_id, document_ids or collection.")
+        return self
+
+class ReadinessResponse(BaseModel):
+    status: str = "ready"
+    warmup_seconds: Optional[float] = None
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    document_id: str
+    document_name: str
+    status: str = Field(..., description="One of queued, parsing, embedding, done or failed.")
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    pages_total: int = Field(0, description="Page count for PDFs; 0 for other formats.")
+    pages_parsed: int = Field(0, description="Pages parsed so far when a large PDF is ingested in streaming mode.")
+    deduplicated: bool = Field(False, description="True when an identical file was already embedded and its chunks were reused.")
+    collection: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkEmbedItem(BaseModel):
+    file_name: str
+    status: str
+    document_id: Optional[str] = None
+    chunks: int = 0
+    error: Optional[str] = None
+
+class BulkEmbedResponse(BaseModel):
+    status: str = Field(..., description="success, partial or error depending on how many files were embedded.")
+    succeeded: int
+    failed: int
+    results: List[BulkEmbedItem]
+
+class EmbeddingCacheStatsResponse(BaseModel):
+    enabled: bool
+    model: Optional[str] = None
+    entries: int = 0
+    max_entries: int = 0
+    chunk_hits: int = 0
+    chunk_misses: int = 0
+    chunk_hit_rate: float = 0.0
+    document_hits: int = 0
+    document_misses: int = 0
+
+class AnswerCacheStatsResponse(BaseModel):
+    enabled: bool
+    entries: int = 0
+    max_entries: int = 0
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    hit_rate: float = 0.0
+
+class HistogramSnapshot(BaseModel):
+    count: int
+    sum: float
+    mean: float
+    buckets: Dict[str, int] = Field(..., description="Cumulative counts keyed by upper bound (le_<bound>).")
+
+class RerankStatsResponse(BaseModel):
+    enabled: bool
+    max_batch_pairs: Optional[int] = None
+    max_wait_ms: Optional[float] = None
+    batch_size_pairs: Optional[HistogramSnapshot] = None
+    queue_wait_seconds: Optional[HistogramSnapshot] = None
+
+class DocumentIndexStatsResponse(BaseModel):
+    enabled: bool
+    documents: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+
+class DocumentDeleteResponse(BaseModel):
+    status: str = "success"
+    message: str = "Document deleted successfully."
+    document_id: str
+
+class DocumentUpdateResponse(BaseModel):
+    status: str = "success"
+    message: str = "Document updated successfully."
+    document_id: str
+    chunks_reused: int = Field(..., description="Unchanged chunks whose stored vectors were kept.")
+    chunks_embedded: int = Field(..., description="New or changed chunks that were embedded.")
+    chunks_deleted: int = Field(..., description="Chunks no longer in the document that were removed.")
+
+class CompactionResponse(BaseModel):
+    status: str = "success"
+    bytes_before: int
+    bytes_after: int
+    bytes_reclaimed: int
+    orphaned_segments_removed: int
+
+class FormatThroughput(BaseModel):
+    files: int
+    bytes: int
+    seconds: float
+    files_per_second: float
+    megabytes_per_second: float
+
+class ParserThroughput(BaseModel):
+    pages: int
+    chars: int
+    seconds: float
+    pages_per_second: float
+
+class ParserStatsResponse(BaseModel):
+    formats: Dict[str, FormatThroughput] = Field(..., description="Whole-file parse throughput keyed by file extension.")
+    parsers: Dict[str, ParserThroughput] = Field(..., description="Per-page throughput keyed by parser (text, docx, pdf_text, ocr, unstructured).")
+
+class CollectionsResponse(BaseModel):
+    collections: Dict[str, int] = Field(..., description="Document count keyed by collection name.")
\ No newline at end of file
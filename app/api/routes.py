@@ -1,55 +1,96 @@
 import os
 import shutil
 import tempfile
-from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException
-from starlette.status import HTTP_400_BAD_REQUEST
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_202_ACCEPTED
 from app.api.models import (
     DocumentEmbedRequest, EmbedSuccessResponse, UnsuccessfulResponse,
-    QueryRequest, QuerySuccessResponse
+    QueryRequest, QuerySuccessResponse, ReadinessResponse, IngestionJobResponse,
+    BulkEmbedItem, BulkEmbedResponse, EmbeddingCacheStatsResponse,
+    AnswerCacheStatsResponse, RerankStatsResponse, DocumentIndexStatsResponse,
+    DocumentDeleteResponse, DocumentUpdateResponse, CompactionResponse, ParserStatsResponse, CollectionsResponse
 )
-from app.services.document_processor import DocumentProcessor
+from app.services.document_processor import DocumentProcessor, SUPPORTED_EXTENSIONS, parser_stats
 from app.services.embedding_service import EmbeddingService
 from app.services.qa_service import QAService
-from app.utils.helpers import generate_unique_id
-from app.core.errors import DocumentProcessingError, EmbeddingError, QueryError, InvalidConversationIDError, EmptyDocumentError, DocumentNotFoundError
+from app.services.model_registry import model_registry
+from app.services.ingestion_jobs import ingestion_jobs
+from app.utils.helpers import generate_unique_id, compute_file_hash, is_archive, extract_archive_members, format_sse_event
+from app.core.config import settings
+from app.core.errors import DocumentProcessingError, EmbeddingError, QueryError, InvalidConversationIDError, EmptyDocumentError, DocumentNotFoundError, TooManyFilesError, LLMOverloadedError, QueryTimeoutError, TooManyDocumentsError, IngestionQueueFullError
 
 router = APIRouter()
 
 def get_document_processor():
-    return DocumentProcessor()
+    model_registry.require_ready()
+    return model_registry.document_processor
 
 def get_embedding_service():
-    return EmbeddingService()
+    model_registry.require_ready()
+    return model_registry.embedding_service
 
-def get_qa_service(embedding_service: EmbeddingService = Depends(get_embedding_service)):
-    return QAService(embedding_service=embedding_service)
+def get_qa_service():
+    model_registry.require_ready()
+    return model_registry.qa_service
 
-@router.post("/embedding", response_model=EmbedSuccessResponse, responses={500: {"model": UnsuccessfulResponse}, 400: {"model": UnsuccessfulResponse}})
-async def embed_document_route(
-    file: UploadFile = File(..., description="The document file (PDF, DOCX, TXT) to embed."),
-    processor: DocumentProcessor = Depends(get_document_processor),
-    embed_service: EmbeddingService = Depends(get_embedding_service)
-):
+@router.get("/ready", response_model=ReadinessResponse, responses={503: {"model": UnsuccessfulResponse}})
+async def readiness_route():
+    model_registry.require_ready()
+    return ReadinessResponse(warmup_seconds=model_registry.warmup_seconds)
+
+def _normalize_collection(collection: Optional[str]) -> Optional[str]:
+    if collection is None:
+        return None
+    return collection.strip() or None
+
+def _save_upload(file: UploadFile) -> Tuple[str, str]:
+    temp_dir = tempfile.mkdtemp()
     try:
-        temp_dir = tempfile.mkdtemp()
-        file_path = os.path.join(temp_dir, file.filename)
+        file_path = os.path.join(temp_dir, os.path.basename(file.filename))
         
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
             
     except Exception as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Could not save uploaded file: {str(e)}")
     finally:
         file.file.close()
+    return temp_dir, file_path
 
+@router.post("/embedding", response_model=EmbedSuccessResponse, responses={500: {"model": UnsuccessfulResponse}, 400: {"model": UnsuccessfulResponse}})
+async def embed_document_route(
+    file: UploadFile = File(..., description="The document file (PDF, DOCX, TXT) to embed."),
+    collection: Optional[str] = Form(None, description="Optional collection name; query every document in it with `collection`."),
+    processor: DocumentProcessor = Depends(get_document_processor),
+    embed_service: EmbeddingService = Depends(get_embedding_service)
+):
+    temp_dir, file_path = _save_upload(file)
     document_id = generate_unique_id()
+    collection = _normalize_collection(collection)
     
     try:
-        chunks = processor.process_document(file_path=file_path, document_name=file.filename)
-        if not chunks:
-            raise EmptyDocumentError()
-            
-        embed_service.embed_and_store_chunks(document_id=document_id, chunks=chunks)
+        file_hash = await run_in_threadpool(compute_file_hash, file_path)
+        reused = await run_in_threadpool(embed_service.reuse_existing_document, file_hash, document_id, file.filename)
+        if reused:
+            await run_in_threadpool(embed_service.record_document, document_id, file.filename, collection, file_hash)
+            return EmbedSuccessResponse(document_id=document_id, message="Identical document already embedded; reused its stored chunks.")
+
+        page_count = await run_in_threadpool(DocumentProcessor.count_pdf_pages, file_path)
+        if page_count >= settings.STREAMING_MIN_PAGES:
+            stored = await ingestion_jobs.ingest_streaming(file_path, document_id, file.filename, page_count, embed_service)
+            if not stored:
+                raise EmptyDocumentError()
+        else:
+            chunks = await run_in_threadpool(processor.process_document, file_path=file_path, document_name=file.filename)
+            if not chunks:
+                raise EmptyDocumentError()
+                
+            await run_in_threadpool(embed_service.embed_and_store_chunks, document_id=document_id, chunks=chunks)
+        await run_in_threadpool(embed_service.record_document, document_id, file.filename, collection, file_hash)
         
         return EmbedSuccessResponse(document_id=document_id)
     
@@ -68,25 +109,207 @@ async def embed_document_route(
             shutil.rmtree(temp_dir)
 
 
-@router.post("/query", response_model=QuerySuccessResponse, responses={500: {"model": UnsuccessfulResponse}, 404: {"model": UnsuccessfulResponse}})
+@router.post("/embedding/jobs", status_code=HTTP_202_ACCEPTED, response_model=IngestionJobResponse, responses={503: {"model": UnsuccessfulResponse}, 400: {"model": UnsuccessfulResponse}})
+async def submit_embedding_job_route(
+    file: UploadFile = File(..., description="The document file (PDF, DOCX, TXT) to embed in the background."),
+    collection: Optional[str] = Form(None, description="Optional collection name; query every document in it with `collection`."),
+    embed_service: EmbeddingService = Depends(get_embedding_service)
+):
+    ingestion_jobs.ensure_capacity()
+    temp_dir, file_path = _save_upload(file)
+    try:
+        job = ingestion_jobs.submit(
+            file_path=file_path,
+            temp_dir=temp_dir,
+            document_name=file.filename,
+            embedding_service=embed_service,
+            collection=_normalize_collection(collection)
+        )
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    return IngestionJobResponse(**job.to_dict())
+
+
+@router.get("/embedding/jobs/{job_id}", response_model=IngestionJobResponse, responses={404: {"model": UnsuccessfulResponse}})
+async def embedding_job_status_route(job_id: str):
+    return IngestionJobResponse(**ingestion_jobs.get(job_id).to_dict())
+
+
+def _save_bulk_uploads(files: List[UploadFile], temp_dir: str) -> Tuple[List[Tuple[str, str]], List[Dict[str, Any]]]:
+    uploads: List[Tuple[str, str]] = []
+    failures: List[Dict[str, Any]] = []
+    for index, file in enumerate(files):
+        file_path = os.path.join(temp_dir, f"{index}_{os.path.basename(file.filename)}")
+        try:
+            with open(file_path, "wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+        except Exception as e:
+            failures.append({"file_name": file.filename, "status": "error", "error": f"Could not save uploaded file: {str(e)}"})
+            continue
+        finally:
+            file.file.close()
+
+        if not is_archive(file_path):
+            uploads.append((file_path, file.filename))
+            continue
+        try:
+            archive_dir = tempfile.mkdtemp(dir=temp_dir)
+            members = extract_archive_members(file_path, archive_dir, SUPPORTED_EXTENSIONS, settings.BULK_MAX_ARCHIVE_BYTES)
+            uploads.extend((member_path, f"{file.filename}/{member_name}") for member_path, member_name in members)
+        except Exception as e:
+            failures.append({"file_name": file.filename, "status": "error", "error": f"Could not extract archive: {str(e)}"})
+
+    if len(uploads) > settings.BULK_MAX_FILES:
+        raise TooManyFilesError(f"Bulk request contains {len(uploads)} documents; the limit is {settings.BULK_MAX_FILES}.")
+    return uploads, failures
+
+
+@router.post("/embedding/bulk", response_model=BulkEmbedResponse, responses={413: {"model": UnsuccessfulResponse}, 400: {"model": UnsuccessfulResponse}, 429: {"model": UnsuccessfulResponse}, 503: {"model": UnsuccessfulResponse}})
+async def bulk_embed_route(
+    files: List[UploadFile] = File(..., description="Document files (PDF, DOCX, TXT) and/or ZIP archives of them."),
+    collection: Optional[str] = Form(None, description="Optional collection name applied to every document in the request."),
+    embed_service: EmbeddingService = Depends(get_embedding_service)
+):
+    ingestion_jobs.ensure_capacity()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        uploads, failures = await run_in_threadpool(_save_bulk_uploads, files, temp_dir)
+        results = await ingestion_jobs.ingest_bulk(uploads, embed_service, _normalize_collection(collection)) + failures
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    items = [BulkEmbedItem(**result) for result in results]
+    succeeded = sum(1 for item in items if item.status == "success")
+    failed = len(items) - succeeded
+    status = "success" if not failed else ("error" if not succeeded else "partial")
+    return BulkEmbedResponse(status=status, succeeded=succeeded, failed=failed, results=items)
+
+
+@router.get("/ingestion/stats", response_model=ParserStatsResponse)
+async def ingestion_stats_route():
+    return ParserStatsResponse(**parser_stats.snapshot())
+
+
+@router.get("/embedding/cache", response_model=EmbeddingCacheStatsResponse)
+async def embedding_cache_stats_route(embed_service: EmbeddingService = Depends(get_embedding_service)):
+    return EmbeddingCacheStatsResponse(**embed_service.cache_stats())
+
+
+@router.delete("/documents/{document_id}", response_model=DocumentDeleteResponse, responses={404: {"model": UnsuccessfulResponse}, 500: {"model": UnsuccessfulResponse}})
+async def delete_document_route(
+    document_id: str,
+    embed_service: EmbeddingService = Depends(get_embedding_service)
+):
+    await run_in_threadpool(embed_service.delete_document, document_id)
+    return DocumentDeleteResponse(document_id=document_id)
+
+
+@router.put("/documents/{document_id}", response_model=DocumentUpdateResponse, responses={400: {"model": UnsuccessfulResponse}, 404: {"model": UnsuccessfulResponse}, 500: {"model": UnsuccessfulResponse}, 503: {"model": UnsuccessfulResponse}})
+async def update_document_route(
+    document_id: str,
+    file: UploadFile = File(..., description="The new version of the document (PDF, DOCX, TXT)."),
+    embed_service: EmbeddingService = Depends(get_embedding_service)
+):
+    # Checked before parsing so an unknown id fails fast instead of after OCR.
+    if not await run_in_threadpool(embed_service.document_exists, document_id):
+        raise DocumentNotFoundError(f"Document ID {document_id} not found.")
+    ingestion_jobs.ensure_capacity()
+
+    temp_dir, file_path = _save_upload(file)
+    try:
+        counts = await ingestion_jobs.update_document(file_path, document_id, file.filename, embed_service)
+        return DocumentUpdateResponse(document_id=document_id, **counts)
+    except (DocumentProcessingError, EmbeddingError, EmptyDocumentError, DocumentNotFoundError, IngestionQueueFullError) as e:
+        raise e
+    except Exception as e:
+        return UnsuccessfulResponse(
+            status="error",
+            message="Failed to update document due to an unexpected server error.",
+            error_details=str(e)
+        )
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@router.post("/admin/compact", response_model=CompactionResponse, responses={500: {"model": UnsuccessfulResponse}})
+async def compact_store_route(
+    sweep_segments: bool = Query(False, description="Also delete HNSW segment directories no longer referenced by Chroma."),
+    embed_service: EmbeddingService = Depends(get_embedding_service)
+):
+    return CompactionResponse(**await run_in_threadpool(embed_service.compact, sweep_segments))
+
+
+@router.get("/collections", response_model=CollectionsResponse)
+async def collections_route(embed_service: EmbeddingService = Depends(get_embedding_service)):
+    return CollectionsResponse(collections=await run_in_threadpool(embed_service.collections))
+
+
+@router.get("/index/stats", response_model=DocumentIndexStatsResponse)
+async def document_index_stats_route(embed_service: EmbeddingService = Depends(get_embedding_service)):
+    return DocumentIndexStatsResponse(**embed_service.index_stats())
+
+
+@router.post("/query", response_model=QuerySuccessResponse, responses={500: {"model": UnsuccessfulResponse}, 400: {"model": UnsuccessfulResponse}, 404: {"model": UnsuccessfulResponse}, 503: {"model": UnsuccessfulResponse}, 504: {"model": UnsuccessfulResponse}})
 async def query_document_route(
     request: QueryRequest,
     qa_service: QAService = Depends(get_qa_service)
 ):
     try:
-        response_data, conv_id = qa_service.query_document(
+        document_ids = await run_in_threadpool(qa_service.resolve_targets, request.document_id, request.document_ids, request.collection)
+        response_data, conv_id = await qa_service.aquery_documents(
             user_query=request.query,
-            document_id=request.document_id,
+            document_ids=document_ids,
             conversation_id=request.conversation_id,
-            require_citations=request.require_citations
+            require_citations=request.require_citations,
+            skip_missing=request.collection is not None
         )
         return QuerySuccessResponse(response=response_data, conversation_id=conv_id)
     
-    except (QueryError, InvalidConversationIDError, DocumentNotFoundError) as e:
+    except (QueryError, InvalidConversationIDError, DocumentNotFoundError, LLMOverloadedError, QueryTimeoutError, TooManyDocumentsError) as e:
         raise e
     except Exception as e:
         return UnsuccessfulResponse(
             status="error",
             message="Failed to process query due to an unexpected server error.",
             error_details=str(e)
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/query/cache", response_model=AnswerCacheStatsResponse)
+async def answer_cache_stats_route(qa_service: QAService = Depends(get_qa_service)):
+    return AnswerCacheStatsResponse(**qa_service.answer_cache_stats())
+
+
+@router.get("/rerank/stats", response_model=RerankStatsResponse)
+async def rerank_stats_route(qa_service: QAService = Depends(get_qa_service)):
+    return RerankStatsResponse(**qa_service.rerank_stats())
+
+
+@router.post(
+    "/query/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"text/event-stream": {}}, "description": "`token` events with answer text, then one `done` event with citations, conversation_id and timings (or an `error` event)."},
+        500: {"model": UnsuccessfulResponse},
+        404: {"model": UnsuccessfulResponse}
+    }
+)
+async def stream_query_route(
+    request: QueryRequest,
+    qa_service: QAService = Depends(get_qa_service)
+):
+    document_ids = await run_in_threadpool(qa_service.resolve_targets, request.document_id, request.document_ids, request.collection)
+    prepared = await qa_service.aprepare_multi_query(
+        user_query=request.query,
+        document_ids=document_ids,
+        conversation_id=request.conversation_id,
+        require_citations=request.require_citations,
+        skip_missing=request.collection is not None
+    )
+    events = (format_sse_event(event, data) async for event, data in qa_service.astream_answer(prepared))
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
\ No newline at end of file
@@ -11,9 +11,82 @@ class Settings:
     
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", 1000))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", 200))
+
+    FAST_PATH_PARSING_ENABLED: bool = os.getenv("FAST_PATH_PARSING_ENABLED", "true").lower() == "true"
+    PDF_TEXT_LAYER_MIN_CHARS: int = int(os.getenv("PDF_TEXT_LAYER_MIN_CHARS", 20))
+    OCR_DPI: int = int(os.getenv("OCR_DPI", 300))
     
     CHROMA_PERSIST_DIRECTORY: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db_store")
     Path(CHROMA_PERSIST_DIRECTORY).mkdir(parents=True, exist_ok=True)
+    CHROMA_COLLECTION_LAYOUT: str = os.getenv("CHROMA_COLLECTION_LAYOUT", "shared").lower()
+
+    RERANKER_MODEL_NAME: str = os.getenv("RERANKER_MODEL_NAME", "BAAI/bge-reranker-base")
+    RERANK_BATCHING_ENABLED: bool = os.getenv("RERANK_BATCHING_ENABLED", "true").lower() == "true"
+    RERANK_MAX_BATCH_PAIRS: int = int(os.getenv("RERANK_MAX_BATCH_PAIRS", 64))
+    RERANK_MAX_WAIT_MS: float = float(os.getenv("RERANK_MAX_WAIT_MS", 5))
+    RERANK_PREDICT_BATCH_SIZE: int = int(os.getenv("RERANK_PREDICT_BATCH_SIZE", 32))
+    RERANK_TIMEOUT_SECONDS: float = float(os.getenv("RERANK_TIMEOUT_SECONDS", 10))
+    INFERENCE_BACKEND: str = os.getenv("INFERENCE_BACKEND", "torch").lower()
+    ONNX_QUANTIZATION: str = os.getenv("ONNX_QUANTIZATION", "none").lower()
+    ONNX_NUM_THREADS: int = int(os.getenv("ONNX_NUM_THREADS", 0))
+    ONNX_MODEL_DIR: str = os.getenv("ONNX_MODEL_DIR", "./onnx_models")
+    WARMUP_LLM: bool = os.getenv("WARMUP_LLM", "false").lower() == "true"
+
+    QUERY_CPU_WORKERS: int = int(os.getenv("QUERY_CPU_WORKERS", 4))
+    QUERY_TIMEOUT_SECONDS: float = float(os.getenv("QUERY_TIMEOUT_SECONDS", 60))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", 10))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 2))
+    LLM_RETRY_BASE_SECONDS: float = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+    LLM_RETRY_MAX_SECONDS: float = float(os.getenv("LLM_RETRY_MAX_SECONDS", 8))
+
+    CONTEXT_PACKING_ENABLED: bool = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() == "true"
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", 700))
+    CONTEXT_MAX_CHUNKS: int = int(os.getenv("CONTEXT_MAX_CHUNKS", 5))
+    CONTEXT_MIN_CHUNKS: int = int(os.getenv("CONTEXT_MIN_CHUNKS", 1))
+    RERANK_SCORE_GAP: float = float(os.getenv("RERANK_SCORE_GAP", 0.25))
+
+    QUERY_PER_TARGET_K: int = int(os.getenv("QUERY_PER_TARGET_K", 5))
+    MULTI_DOC_MAX_TARGETS: int = int(os.getenv("MULTI_DOC_MAX_TARGETS", 100))
+    MULTI_DOC_MAX_CANDIDATES: int = int(os.getenv("MULTI_DOC_MAX_CANDIDATES", 50))
+    MULTI_DOC_TOP_N: int = int(os.getenv("MULTI_DOC_TOP_N", 6))
+
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", 64))
+    ENCODE_BATCH_SIZE: int = int(os.getenv("ENCODE_BATCH_SIZE", 32))
+    BULK_EMBED_BATCH_SIZE: int = int(os.getenv("BULK_EMBED_BATCH_SIZE", 256))
+    BULK_MAX_FILES: int = int(os.getenv("BULK_MAX_FILES", 200))
+    BULK_MAX_ARCHIVE_BYTES: int = int(os.getenv("BULK_MAX_ARCHIVE_BYTES", 500 * 1024 * 1024))
+
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CHROMA_PERSIST_DIRECTORY, "embedding_cache.sqlite3"))
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 200000))
+    DOCUMENT_CATALOG_PATH: str = os.getenv("DOCUMENT_CATALOG_PATH", os.path.join(CHROMA_PERSIST_DIRECTORY, "documents.sqlite3"))
+
+    DOCUMENT_INDEX_CACHE_ENABLED: bool = os.getenv("DOCUMENT_INDEX_CACHE_ENABLED", "true").lower() == "true"
+    DOCUMENT_INDEX_CACHE_MAX_BYTES: int = int(os.getenv("DOCUMENT_INDEX_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+    ANSWER_CACHE_TTL_SECONDS: float = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 3600))
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", 0.95))
+
+    CONVERSATION_STORE_BACKEND: str = os.getenv("CONVERSATION_STORE_BACKEND", "memory").lower()
+    CONVERSATION_DB_PATH: str = os.getenv("CONVERSATION_DB_PATH", os.path.join(CHROMA_PERSIST_DIRECTORY, "conversations.sqlite3"))
+    CONVERSATION_MAX_CONVERSATIONS: int = int(os.getenv("CONVERSATION_MAX_CONVERSATIONS", 10000))
+    CONVERSATION_TTL_SECONDS: float = float(os.getenv("CONVERSATION_TTL_SECONDS", 86400))
+    CONVERSATION_MAX_MESSAGES: int = int(os.getenv("CONVERSATION_MAX_MESSAGES", 200))
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", 1500))
+    HISTORY_SUMMARY_MAX_TOKENS: int = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", 300))
+    INGESTION_WORKERS: int = int(os.getenv("INGESTION_WORKERS", 2))
+    INGESTION_MAX_QUEUE_SIZE: int = int(os.getenv("INGESTION_MAX_QUEUE_SIZE", 32))
+    INGESTION_JOB_RETENTION: int = int(os.getenv("INGESTION_JOB_RETENTION", 1000))
+    STREAMING_MIN_PAGES: int = int(os.getenv("STREAMING_MIN_PAGES", 30))
+    STREAMING_PAGES_PER_TASK: int = int(os.getenv("STREAMING_PAGES_PER_TASK", 8))
+    STREAMING_MAX_IN_FLIGHT_RANGES: int = int(os.getenv("STREAMING_MAX_IN_FLIGHT_RANGES", 4))
+
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
 
 
 settings = Settings()
@@ -22,4 +22,36 @@ class DocumentNotFoundError(HTTPException):
 
 class EmptyDocumentError(HTTPException):
     def __init__(self, detail: str = "Document content is empty or could not be processed."):
-        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
\ No newline at end of file
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+class ServiceNotReadyError(HTTPException):
+    def __init__(self, detail: str = "Models are still loading. Please retry shortly."):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail)
+
+class IngestionQueueFullError(HTTPException):
+    def __init__(self, detail: str = "Ingestion queue is full. Please retry later.", retry_after: int = 5):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail, headers={"Retry-After": str(retry_after)})
+
+class IngestionQueueOverflowError(HTTPException):
+    def __init__(self, detail: str = "Request has more documents than the ingestion queue has room for.", retry_after: int = 5):
+        super().__init__(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=detail, headers={"Retry-After": str(retry_after)})
+
+class JobNotFoundError(HTTPException):
+    def __init__(self, detail: str = "Ingestion job ID not found."):
+        super().__init__(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+class TooManyFilesError(HTTPException):
+    def __init__(self, detail: str = "Too many files in a single bulk request."):
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+class LLMOverloadedError(HTTPException):
+    def __init__(self, detail: str = "Too many queries are waiting for the language model. Please retry shortly.", retry_after: int = 2):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail, headers={"Retry-After": str(retry_after)})
+
+class QueryTimeoutError(HTTPException):
+    def __init__(self, detail: str = "The query timed out."):
+        super().__init__(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=detail)
+
+class TooManyDocumentsError(HTTPException):
+    def __init__(self, detail: str = "Too many documents in a single query."):
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
@@ -0,0 +1,72 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily
+from app.core.config import settings
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram("rag_stage_duration_seconds", "Time spent in each pipeline stage.", ["component", "stage"], buckets=STAGE_BUCKETS)
+CHUNKS_EMBEDDED = Counter("rag_chunks_embedded_total", "Chunks written to the vector store.")
+EMBEDDING_CACHE_LOOKUPS = Counter("rag_embedding_cache_lookups_total", "Chunk embedding cache lookups.", ["result"])
+ANSWER_CACHE_LOOKUPS = Counter("rag_answer_cache_lookups_total", "Answer cache lookups.", ["result"])
+RERANK_BATCH_PAIRS = Histogram("rag_rerank_batch_pairs", "Query-passage pairs per cross-encoder call.", buckets=(1, 5, 10, 20, 40, 64, 128, 256))
+LLM_REQUESTS = Counter("rag_llm_requests_total", "LLM calls.", ["mode", "outcome"])
+CONTEXT_TOKENS = Counter("rag_context_tokens_total", "Retrieved-context tokens sent to the LLM, and tokens saved by context packing.", ["kind"])
+LLM_TOKENS = Counter("rag_llm_tokens_total", "LLM tokens; estimated from text length when the provider reports no usage.", ["direction"])
+
+# Set per request by the Server-Timing middleware; None means nobody is collecting.
+request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+@contextmanager
+def timed_stage(component: str, stage: str) -> Iterator[None]:
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(component, stage).observe(elapsed)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.append((f"{component}-{stage}", elapsed))
+
+def record_llm_tokens(input_tokens: int, output_tokens: int):
+    if settings.METRICS_ENABLED:
+        LLM_TOKENS.labels("input").inc(input_tokens)
+        LLM_TOKENS.labels("output").inc(output_tokens)
+
+def format_server_timing(timings: List[Tuple[str, float]]) -> str:
+    # Stages that run more than once per request (e.g. one store per batch) are summed.
+    totals: Dict[str, float] = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class ParserThroughputCollector:
+    # Parsing mostly runs in pool workers, whose stats are merged back into the parent's ParserStats;
+    # exposing that snapshot at scrape time covers them without multiprocess Prometheus mode.
+    def __init__(self, snapshot: Callable[[], Dict[str, Any]]):
+        self.snapshot = snapshot
+
+    def collect(self):
+        snapshot = self.snapshot()
+        pages = CounterMetricFamily("rag_parser_pages", "Pages parsed, by parser.", labels=["parser"])
+        parser_seconds = CounterMetricFamily("rag_parser_seconds", "Time spent parsing pages, by parser.", labels=["parser"])
+        for parser, totals in snapshot["parsers"].items():
+            pages.add_metric([parser], totals["pages"])
+            parser_seconds.add_metric([parser], totals["seconds"])
+        files = CounterMetricFamily("rag_parsed_files", "Files parsed, by format.", labels=["format"])
+        file_bytes = CounterMetricFamily("rag_parsed_bytes", "Bytes of parsed files, by format.", labels=["format"])
+        for file_format, totals in snapshot["formats"].items():
+            files.add_metric([file_format], totals["files"])
+            file_bytes.add_metric([file_format], totals["bytes"])
+        return [pages, parser_seconds, files, file_bytes]
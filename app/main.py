@@ -1,16 +1,54 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import REGISTRY
 from fastapi.exceptions import HTTPException as FastAPIHTTPException
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.api.routes import router as api_router
 from app.core.config import settings 
+from app.core.metrics import ParserThroughputCollector, format_server_timing, render_metrics, request_timings
+from app.services.document_processor import parser_stats
+from app.services.model_registry import model_registry
+from app.services.ingestion_jobs import ingestion_jobs
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm the models in the background so /api/ready can report progress.
+    load_task = asyncio.create_task(run_in_threadpool(model_registry.load))
+    ingestion_jobs.start()
+    yield
+    ingestion_jobs.shutdown()
+    model_registry.shutdown()
+    if not load_task.done():
+        load_task.cancel()
 
 app = FastAPI(
     title="Document Intelligence RAG Chatbot API",
     description="API for embedding documents and querying them using a RAG chatbot system.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+REGISTRY.register(ParserThroughputCollector(parser_stats.snapshot))
+
+if settings.SERVER_TIMING_ENABLED:
+    @app.middleware("http")
+    async def server_timing_middleware(request: Request, call_next):
+        timings = []
+        token = request_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            request_timings.reset(token)
+        # Streaming bodies are still running here, so their LLM stages are only in /metrics.
+        timings.append(("total", time.perf_counter() - started))
+        response.headers["Server-Timing"] = format_server_timing(timings)
+        return response
+
 @app.exception_handler(FastAPIHTTPException)
 async def http_exception_handler(request: Request, exc: FastAPIHTTPException):
     return JSONResponse(
@@ -20,6 +58,7 @@ async def http_exception_handler(request: Request, exc: FastAPIHTTPException):
             "message": exc.detail,
             "error_details": None 
         },
+        headers=getattr(exc, "headers", None),
     )
 
 @app.exception_handler(StarletteHTTPException)
@@ -31,6 +70,7 @@ async def starlette_http_exception_handler(request: Request, exc: StarletteHTTPE
             "message": exc.detail,
             "error_details": None
         },
+        headers=getattr(exc, "headers", None),
     )
 
 @app.exception_handler(Exception) 
@@ -47,6 +87,11 @@ async def generic_exception_handler(request: Request, exc: Exception):
 
 app.include_router(api_router, prefix="/api")
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Welcome to the Document Intelligence RAG Chatbot API. Visit /docs for API documentation."}
@@ -0,0 +1,142 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!. ")
+
+
+class AnswerCacheEntry:
+    def __init__(self, embedding: List[float], response: Dict[str, Any], expires_at: float, generation: int):
+        self.embedding = np.asarray(embedding, dtype=np.float32)
+        self.response = response
+        self.expires_at = expires_at
+        self.generation = generation
+
+
+class AnswerCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lru: "OrderedDict[Tuple[str, str], AnswerCacheEntry]" = OrderedDict()
+        self._by_document: Dict[str, Dict[str, AnswerCacheEntry]] = {}
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    # generation is the document's generation in the shared catalog, read by the caller for this query. Entries
+    # are only valid for the generation they were computed at, so changes made by other processes are honoured.
+    def lookup(self, document_id: str, normalized_query: str, query_embedding: List[float], generation: int) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            self._drop_stale(document_id, generation)
+            entries = self._by_document.get(document_id, {})
+            entry = entries.get(normalized_query)
+            if entry is not None and entry.expires_at > now:
+                self._lru.move_to_end((document_id, normalized_query))
+                self.exact_hits += 1
+                return copy.deepcopy(entry.response)
+
+            best_key, best_score = None, self.similarity_threshold
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            for cached_query, candidate in entries.items():
+                if candidate.expires_at <= now:
+                    continue
+                # Embeddings are L2-normalised, so the dot product is the cosine similarity.
+                score = float(np.dot(candidate.embedding, query_vector))
+                if score >= best_score:
+                    best_key, best_score = cached_query, score
+            if best_key is not None:
+                self._lru.move_to_end((document_id, best_key))
+                self.semantic_hits += 1
+                return copy.deepcopy(entries[best_key].response)
+
+            self.misses += 1
+            return None
+
+    def begin(self, document_id: str, normalized_query: str, generation: int) -> Tuple[Future, bool]:
+        # The first caller for a key computes the answer; concurrent callers wait on its future.
+        key = (document_id, normalized_query)
+        with self._lock:
+            self._drop_stale(document_id, generation)
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            # A leader may have stored the answer between the caller's lookup and now.
+            entry = self._by_document.get(document_id, {}).get(normalized_query)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._lru.move_to_end(key)
+                self.coalesced += 1
+                future = Future()
+                future.set_result(copy.deepcopy(entry.response))
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def store(self, document_id: str, normalized_query: str, query_embedding: List[float], response: Dict[str, Any], generation: int):
+        # generation is the one read before the answer was computed; if the document changed meanwhile,
+        # the entry is already stale and the next lookup drops it.
+        key = (document_id, normalized_query)
+        with self._lock:
+            future = self._inflight.pop(key, None)
+            entry = AnswerCacheEntry(query_embedding, copy.deepcopy(response), time.monotonic() + self.ttl_seconds, generation)
+            self._lru[key] = entry
+            self._lru.move_to_end(key)
+            self._by_document.setdefault(document_id, {})[normalized_query] = entry
+            while len(self._lru) > self.max_entries:
+                self._remove(*self._lru.popitem(last=False)[0])
+        if future is not None:
+            future.set_result(copy.deepcopy(response))
+
+    def fail(self, document_id: str, normalized_query: str, error: BaseException):
+        with self._lock:
+            future = self._inflight.pop((document_id, normalized_query), None)
+        if future is not None:
+            future.set_exception(error)
+
+    def invalidate(self, document_id: str):
+        # Frees this process's entries right away; other processes drop theirs through the generation check.
+        with self._lock:
+            for normalized_query in list(self._by_document.pop(document_id, {})):
+                self._lru.pop((document_id, normalized_query), None)
+
+    def _drop_stale(self, document_id: str, generation: int):
+        entries = self._by_document.get(document_id)
+        if not entries:
+            return
+        for normalized_query in [query for query, entry in entries.items() if entry.generation != generation]:
+            self._lru.pop((document_id, normalized_query), None)
+            self._remove(document_id, normalized_query)
+
+    def _remove(self, document_id: str, normalized_query: str):
+        entries = self._by_document.get(document_id)
+        if entries is not None:
+            entries.pop(normalized_query, None)
+            if not entries:
+                del self._by_document[document_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "enabled": True,
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,101 @@
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.helpers import estimate_tokens
+
+# Parsers that emit one document per page and split it, so start_index is an offset into the whole page.
+# Unstructured chunks are split per element, and their start_index is relative to that element.
+PAGE_LEVEL_PARSERS = {"text", "docx", "pdf_text", "ocr"}
+
+class PackedContext:
+    def __init__(self, docs: List[Any], snippets: List[str], baseline_tokens: int, packed_tokens: int, overlap_tokens: int):
+        self.docs = docs
+        self.snippets = snippets
+        self.baseline_tokens = baseline_tokens
+        self.packed_tokens = packed_tokens
+        self.overlap_tokens = overlap_tokens
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(self.baseline_tokens - self.packed_tokens, 0)
+
+class ContextBuilder:
+    def __init__(self, token_budget: int, score_gap: float, min_chunks: int = 1):
+        self.token_budget = token_budget
+        self.score_gap = score_gap
+        self.min_chunks = min_chunks
+
+    def build(self, scored_docs: List[Tuple[Optional[float], Any]], max_chunks: int, baseline_chunks: int) -> PackedContext:
+        # scored_docs is in reranked order; scores are None when reranking was skipped.
+        # Savings are measured against sending the top baseline_chunks in full, which is what happens without packing.
+        candidates = scored_docs[:max_chunks]
+        docs, snippets = [], []
+        spans: Dict[Tuple[Any, Any], List[Tuple[int, int, str]]] = {}
+        packed_tokens = overlap_tokens = 0
+        previous_score = None
+
+        for score, doc in candidates:
+            if len(docs) >= self.min_chunks:
+                # A sharp drop in reranker score marks where relevant context ends.
+                if score is not None and previous_score is not None and previous_score - score > self.score_gap:
+                    break
+            text = self._trim_overlap(doc, spans)
+            if not text.strip():
+                # Fully covered by chunks already packed from the same page, so its citation is already present.
+                overlap_tokens += estimate_tokens(doc.page_content)
+                continue
+            cost = estimate_tokens(text)
+            if len(docs) >= self.min_chunks and packed_tokens + cost > self.token_budget:
+                break
+            overlap_tokens += estimate_tokens(doc.page_content) - cost
+            packed_tokens += cost
+            previous_score = score
+            docs.append(doc)
+            snippets.append(text)
+            self._remember_span(doc, spans)
+
+        baseline_tokens = sum(estimate_tokens(doc.page_content) for _, doc in scored_docs[:baseline_chunks])
+        return PackedContext(docs, snippets, baseline_tokens, packed_tokens, overlap_tokens)
+
+    def _span_key(self, doc: Any) -> Optional[Tuple[Any, Any]]:
+        if doc.metadata.get("parser") not in PAGE_LEVEL_PARSERS:
+            return None
+        start = doc.metadata.get("start_index")
+        if not isinstance(start, int) or start < 0:
+            return None
+        return doc.metadata.get("document_id"), doc.metadata.get("page_number")
+
+    def _remember_span(self, doc: Any, spans: Dict[Tuple[Any, Any], List[Tuple[int, int, str]]]):
+        key = self._span_key(doc)
+        if key is not None:
+            start = doc.metadata["start_index"]
+            spans.setdefault(key, []).append((start, start + len(doc.page_content), doc.page_content))
+
+    def _trim_overlap(self, doc: Any, spans: Dict[Tuple[Any, Any], List[Tuple[int, int, str]]]) -> str:
+        text = doc.page_content
+        key = self._span_key(doc)
+        if key is None or key not in spans:
+            return text
+        start = doc.metadata["start_index"]
+        end = start + len(text)
+
+        covered = []
+        for other_start, other_end, other_text in spans[key]:
+            overlap_start, overlap_end = max(start, other_start), min(end, other_end)
+            if overlap_start >= overlap_end:
+                continue
+            # start_index is only trusted where both chunks really hold the same characters.
+            if text[overlap_start - start:overlap_end - start] != other_text[overlap_start - other_start:overlap_end - other_start]:
+                continue
+            covered.append((overlap_start - start, overlap_end - start))
+        if not covered:
+            return text
+
+        pieces, position = [], 0
+        for covered_start, covered_end in sorted(covered):
+            if covered_start > position:
+                pieces.append(text[position:covered_start].strip())
+            position = max(position, covered_end)
+        if position < len(text):
+            pieces.append(text[position:].strip())
+        trimmed = " ... ".join(piece for piece in pieces if piece)
+        # Marks the snippet as continuing one already in the context.
+        return f"... {trimmed}" if trimmed and min(covered)[0] == 0 else trimmed
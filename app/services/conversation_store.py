@@ -0,0 +1,146 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+class ConversationStore(ABC):
+    def __init__(self, max_conversations: int, ttl_seconds: float, max_messages: int):
+        # Both backends must agree on what the limits mean, so a zero or negative limit is rejected up front.
+        if max_conversations <= 0 or max_messages <= 0 or ttl_seconds <= 0:
+            raise ValueError("CONVERSATION_MAX_CONVERSATIONS, CONVERSATION_MAX_MESSAGES and CONVERSATION_TTL_SECONDS must be positive.")
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+
+    @abstractmethod
+    def get_messages(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        pass
+
+    @abstractmethod
+    def append_messages(self, conversation_id: str, messages: List[Dict[str, str]]):
+        pass
+
+
+class InMemoryConversationStore(ConversationStore):
+    def __init__(self, max_conversations: int, ttl_seconds: float, max_messages: int):
+        super().__init__(max_conversations, ttl_seconds, max_messages)
+        self._conversations: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+        self._updated_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get_messages(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        with self._lock:
+            messages = self._conversations.get(conversation_id)
+            if messages is None:
+                return None
+            if time.time() - self._updated_at[conversation_id] > self.ttl_seconds:
+                self._drop(conversation_id)
+                return None
+            self._conversations.move_to_end(conversation_id)
+            return list(messages)
+
+    def append_messages(self, conversation_id: str, messages: List[Dict[str, str]]):
+        with self._lock:
+            history = self._conversations.setdefault(conversation_id, [])
+            history.extend(messages)
+            del history[:-self.max_messages]
+            self._conversations.move_to_end(conversation_id)
+            self._updated_at[conversation_id] = time.time()
+            while len(self._conversations) > self.max_conversations:
+                self._drop(next(iter(self._conversations)))
+
+    def _drop(self, conversation_id: str):
+        self._conversations.pop(conversation_id, None)
+        self._updated_at.pop(conversation_id, None)
+
+
+class SQLiteConversationStore(ConversationStore):
+    # Purging on every write would dominate small appends, so expired rows are cleared periodically.
+    PURGE_EVERY_WRITES = 100
+
+    def __init__(self, path: str, max_conversations: int, ttl_seconds: float, max_messages: int):
+        super().__init__(max_conversations, ttl_seconds, max_messages)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "conversation_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated_at ON conversations (updated_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "conversation_id TEXT NOT NULL REFERENCES conversations (conversation_id) ON DELETE CASCADE, "
+            "role TEXT NOT NULL, content TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_conversation_messages_conversation ON conversation_messages (conversation_id, id)")
+
+    def get_messages(self, conversation_id: str) -> Optional[List[Dict[str, str]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at FROM conversations WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+            if row is None or time.time() - row[0] > self.ttl_seconds:
+                return None
+            rows = self._conn.execute(
+                "SELECT role, content FROM conversation_messages WHERE conversation_id = ? ORDER BY id",
+                (conversation_id,)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append_messages(self, conversation_id: str, messages: List[Dict[str, str]]):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.execute(
+                    "INSERT INTO conversations (conversation_id, updated_at) VALUES (?, ?) "
+                    "ON CONFLICT (conversation_id) DO UPDATE SET updated_at = excluded.updated_at",
+                    (conversation_id, time.time())
+                )
+                self._conn.executemany(
+                    "INSERT INTO conversation_messages (conversation_id, role, content) VALUES (?, ?, ?)",
+                    [(conversation_id, message["role"], message["content"]) for message in messages]
+                )
+                self._conn.execute(
+                    "DELETE FROM conversation_messages WHERE conversation_id = ? AND id NOT IN ("
+                    "SELECT id FROM conversation_messages WHERE conversation_id = ? ORDER BY id DESC LIMIT ?)",
+                    (conversation_id, conversation_id, self.max_messages)
+                )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY_WRITES == 0:
+                self._purge()
+
+    def _purge(self):
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM conversations WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM conversations WHERE conversation_id IN ("
+                "SELECT conversation_id FROM conversations ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_conversations,)
+            )
+
+
+def create_conversation_store() -> ConversationStore:
+    if settings.CONVERSATION_STORE_BACKEND == "sqlite":
+        return SQLiteConversationStore(
+            path=settings.CONVERSATION_DB_PATH,
+            max_conversations=settings.CONVERSATION_MAX_CONVERSATIONS,
+            ttl_seconds=settings.CONVERSATION_TTL_SECONDS,
+            max_messages=settings.CONVERSATION_MAX_MESSAGES
+        )
+    if settings.CONVERSATION_STORE_BACKEND != "memory":
+        raise ValueError(f"Unknown CONVERSATION_STORE_BACKEND '{settings.CONVERSATION_STORE_BACKEND}'. Use 'memory' or 'sqlite'.")
+    return InMemoryConversationStore(
+        max_conversations=settings.CONVERSATION_MAX_CONVERSATIONS,
+        ttl_seconds=settings.CONVERSATION_TTL_SECONDS,
+        max_messages=settings.CONVERSATION_MAX_MESSAGES
+    )
@@ -0,0 +1,69 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+class DocumentCatalog:
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, document_name TEXT NOT NULL, collection TEXT, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents (collection)")
+        # Separate from documents so a delete still advances it. Every process compares it against what it cached.
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS document_generations (document_id TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+
+    def register(self, document_id: str, document_name: str, collection: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (document_id, document_name, collection, created_at) VALUES (?, ?, ?, ?)",
+                (document_id, document_name, collection, time.time())
+            )
+
+    def update_name(self, document_id: str, document_name: str):
+        # Keeps the collection; documents embedded before the catalog existed are added without one.
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO documents (document_id, document_name, collection, created_at) VALUES (?, ?, NULL, ?) "
+                "ON CONFLICT(document_id) DO UPDATE SET document_name = excluded.document_name",
+                (document_id, document_name, time.time())
+            )
+
+    def forget(self, document_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+
+    def bump_generation(self, document_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO document_generations (document_id, generation) VALUES (?, 1) "
+                "ON CONFLICT(document_id) DO UPDATE SET generation = generation + 1",
+                (document_id,)
+            )
+
+    def generation(self, document_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generation FROM document_generations WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def document_ids(self, collection: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document_id FROM documents WHERE collection = ? ORDER BY created_at", (collection,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def collections(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT collection, COUNT(*) FROM documents WHERE collection IS NOT NULL GROUP BY collection ORDER BY collection"
+            ).fetchall()
+        return {collection: count for collection, count in rows}
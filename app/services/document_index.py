@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+import numpy as np
+from langchain_core.documents import Document
+
+class DocumentIndex:
+    def __init__(self, document_id: str, embeddings: Any, texts: List[str], metadatas: List[Dict[str, Any]]):
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.document_id = document_id
+        self.embeddings = matrix / norms
+        self.texts = texts
+        self.metadatas = metadatas
+        self.generation = 0
+        self.nbytes = self.embeddings.nbytes + sum(len(text) for text in texts)
+
+    def search(self, query_embedding: List[float], k: int) -> List[Document]:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = self.embeddings @ query
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [Document(page_content=self.texts[i], metadata=dict(self.metadatas[i])) for i in top]
+
+
+class DocumentIndexCache:
+    def __init__(self, loader: Callable[[str], Optional[DocumentIndex]], max_bytes: int, generation_of: Callable[[str], int]):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.generation_of = generation_of
+        self.hits = 0
+        self.misses = 0
+        self._indexes: "OrderedDict[str, DocumentIndex]" = OrderedDict()
+        self._bytes = 0
+        self._loading: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="document-index-loader")
+
+    def search(self, document_id: str, query_embedding: List[float], k: int) -> Optional[List[Document]]:
+        # Read before any load is scheduled, so an index is never tagged newer than the chunks it holds.
+        # The generation is shared by every process, so an index another worker made stale is reloaded.
+        try:
+            generation = self.generation_of(document_id)
+        except Exception as e:
+            print(f"Warning: Could not read the generation of document {document_id}; searching ChromaDB. Error: {str(e)}")
+            return None
+        with self._lock:
+            index = self._indexes.get(document_id)
+            if index is not None and index.generation != generation:
+                self._drop(document_id)
+                index = None
+            if index is None:
+                self.misses += 1
+                # The caller falls back to Chroma for this query; the matrix is loaded off the request path.
+                if document_id not in self._loading:
+                    self._loading.add(document_id)
+                    self._executor.submit(self._load, document_id, generation)
+                return None
+            self._indexes.move_to_end(document_id)
+            self.hits += 1
+        return index.search(query_embedding, k)
+
+    def _load(self, document_id: str, generation: int):
+        try:
+            index = self.loader(document_id)
+        except Exception as e:
+            print(f"Warning: Could not load in-memory index for document {document_id}. Error: {str(e)}")
+            index = None
+
+        with self._lock:
+            self._loading.discard(document_id)
+            if index is None or index.nbytes > self.max_bytes:
+                return
+            index.generation = generation
+            self._drop(document_id)
+            self._indexes[document_id] = index
+            self._bytes += index.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._indexes.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def invalidate(self, document_id: str):
+        # Frees the memory right away; correctness comes from the generation check in search().
+        with self._lock:
+            self._drop(document_id)
+
+    def _drop(self, document_id: str):
+        index = self._indexes.pop(document_id, None)
+        if index is not None:
+            self._bytes -= index.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "documents": len(self._indexes),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
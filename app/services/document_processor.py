@@ -1,11 +1,83 @@
 import os
-from typing import List, Dict, Any
-from unstructured.partition.auto import partition
-from unstructured.cleaners.core import clean
+import re
+import tempfile
+import threading
+import time
+from typing import List, Dict, Any, Optional
+import docx
+from docx.oxml.ns import qn
+import pytesseract
+from pdf2image import convert_from_path
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from pypdf import PdfReader, PdfWriter
 from app.core.config import settings
 from app.core.errors import DocumentProcessingError
+from app.core.metrics import timed_stage
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
+
+class ParserStats:
+    def __init__(self):
+        self._formats: Dict[str, Dict[str, float]] = {}
+        self._parsers: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record_file(self, file_format: str, size_bytes: int, seconds: float):
+        with self._lock:
+            totals = self._formats.setdefault(file_format, {"files": 0, "bytes": 0, "seconds": 0.0})
+            totals["files"] += 1
+            totals["bytes"] += size_bytes
+            totals["seconds"] += seconds
+
+    def record_pages(self, parser: str, pages: int, chars: int, seconds: float):
+        with self._lock:
+            totals = self._parsers.setdefault(parser, {"pages": 0, "chars": 0, "seconds": 0.0})
+            totals["pages"] += pages
+            totals["chars"] += chars
+            totals["seconds"] += seconds
+
+    def drain(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        with self._lock:
+            delta = {"formats": self._formats, "parsers": self._parsers}
+            self._formats, self._parsers = {}, {}
+        return delta
+
+    def merge(self, delta: Dict[str, Dict[str, Dict[str, float]]]):
+        with self._lock:
+            for target, source in ((self._formats, delta["formats"]), (self._parsers, delta["parsers"])):
+                for key, values in source.items():
+                    totals = target.setdefault(key, {name: 0 for name in values})
+                    for name, value in values.items():
+                        totals[name] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            formats = {
+                file_format: {
+                    "files": int(totals["files"]),
+                    "bytes": int(totals["bytes"]),
+                    "seconds": round(totals["seconds"], 3),
+                    "files_per_second": round(totals["files"] / totals["seconds"], 3) if totals["seconds"] else 0.0,
+                    "megabytes_per_second": round(totals["bytes"] / 1048576 / totals["seconds"], 3) if totals["seconds"] else 0.0,
+                }
+                for file_format, totals in self._formats.items()
+            }
+            parsers = {
+                parser: {
+                    "pages": int(totals["pages"]),
+                    "chars": int(totals["chars"]),
+                    "seconds": round(totals["seconds"], 3),
+                    "pages_per_second": round(totals["pages"] / totals["seconds"], 3) if totals["seconds"] else 0.0,
+                }
+                for parser, totals in self._parsers.items()
+            }
+        return {"formats": formats, "parsers": parsers}
+
+
+# Per process; pool workers drain theirs back to the parent with each result.
+parser_stats = ParserStats()
+
 
 class DocumentProcessor:
     def __init__(self):
@@ -20,11 +92,185 @@ class DocumentProcessor:
         if not os.path.exists(file_path):
             raise DocumentProcessingError(f"File not found: {file_path}")
 
+        started = time.perf_counter()
+        extension = os.path.splitext(file_path)[1].lower()
+        page_docs = None
+        if settings.FAST_PATH_PARSING_ENABLED:
+            try:
+                if extension == ".txt":
+                    with timed_stage("parser", "text"):
+                        page_docs = self._parse_text_file(file_path, document_name)
+                elif extension == ".docx":
+                    with timed_stage("parser", "docx"):
+                        page_docs = self._parse_docx_file(file_path, document_name)
+                elif extension == ".pdf":
+                    with timed_stage("parser", "pdf"):
+                        page_docs = self._parse_pdf_pages(file_path, document_name, 1, len(PdfReader(file_path).pages))
+            except Exception as e:
+                print(f"Warning: Fast-path parsing failed for {document_name}; falling back to unstructured. Error: {str(e)}")
+                page_docs = None
+
+        if page_docs is None:
+            split_docs = self._partition_with_unstructured(file_path, document_name)
+        else:
+            with timed_stage("parser", "split"):
+                split_docs = self.text_splitter.split_documents(page_docs)
+        parser_stats.record_file(extension or "unknown", os.path.getsize(file_path), time.perf_counter() - started)
+        return split_docs
+
+    @staticmethod
+    def count_pdf_pages(file_path: str) -> int:
+        if not file_path.lower().endswith(".pdf"):
+            return 0
         try:
-            elements = partition(filename=file_path, strategy="auto", ocr_languages="eng") 
+            return len(PdfReader(file_path).pages)
+        except Exception:
+            return 0
+
+    def process_page_range(self, file_path: str, document_name: str, first_page: int, last_page: int) -> List[Document]:
+        if not os.path.exists(file_path):
+            raise DocumentProcessingError(f"File not found: {file_path}")
+
+        if settings.FAST_PATH_PARSING_ENABLED:
+            try:
+                with timed_stage("parser", "pdf"):
+                    page_docs = self._parse_pdf_pages(file_path, document_name, first_page, last_page)
+                with timed_stage("parser", "split"):
+                    return self.text_splitter.split_documents(page_docs)
+            except Exception as e:
+                print(f"Warning: Fast-path parsing failed for pages {first_page}-{last_page} of {document_name}; falling back to unstructured. Error: {str(e)}")
+
+        fd, range_path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        started = time.perf_counter()
+        try:
+            reader = PdfReader(file_path)
+            writer = PdfWriter()
+            for page_index in range(first_page - 1, last_page):
+                writer.add_page(reader.pages[page_index])
+            with open(range_path, "wb") as f:
+                writer.write(f)
+            with timed_stage("parser", "partition"):
+                from unstructured.partition.auto import partition
+
+                elements = partition(filename=range_path, strategy="auto", ocr_languages="eng")
+        except Exception as e:
+            raise DocumentProcessingError(f"Failed to partition pages {first_page}-{last_page} of document {document_name}: {str(e)}")
+        finally:
+            os.remove(range_path)
+
+        # Pages in the extracted range restart at 1, so shift them back to their position in the original file.
+        split_docs = self._split_elements(elements, document_name, page_offset=first_page - 1)
+        parser_stats.record_pages("unstructured", last_page - first_page + 1, sum(len(doc.page_content) for doc in split_docs), time.perf_counter() - started)
+        return split_docs
+
+    def _page_document(self, text: str, document_name: str, page_number: int, parser: str) -> Optional[Document]:
+        text = self._normalize_text(text)
+        if not text:
+            return None
+        return Document(page_content=text, metadata={
+            "document_name": document_name,
+            "page_number": page_number,
+            "source_element_type": "Text",
+            "parser": parser
+        })
+
+    def _normalize_text(self, text: str) -> str:
+        # Keep line and paragraph breaks so the splitter can still cut on them.
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        text = re.sub(r"[^\S\n]+", " ", text)
+        text = re.sub(r" ?\n ?", "\n", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)
+        return text.strip()
+
+    def _parse_text_file(self, file_path: str, document_name: str) -> List[Document]:
+        started = time.perf_counter()
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        page_doc = self._page_document(text, document_name, 1, "text")
+        parser_stats.record_pages("text", 1, len(text), time.perf_counter() - started)
+        return [page_doc] if page_doc else []
+
+    def _parse_docx_file(self, file_path: str, document_name: str) -> List[Document]:
+        started = time.perf_counter()
+        document = docx.Document(file_path)
+        pages: List[List[str]] = [[]]
+        after_manual_break = False
+        for block in document.element.body.iterchildren():
+            tag = block.tag.rsplit("}", 1)[-1]
+            if tag == "p":
+                # Walk the paragraph in order so text before a break stays on the earlier page. Word also marks the
+                # start of the page a manual break opened with lastRenderedPageBreak; that one must not count twice.
+                text = ""
+                for node in block.iter(qn("w:t"), qn("w:br"), qn("w:lastRenderedPageBreak")):
+                    if node.tag == qn("w:t"):
+                        text += node.text or ""
+                        after_manual_break = after_manual_break and not (node.text or "").strip()
+                    elif node.tag == qn("w:br") and node.get(qn("w:type")) != "page":
+                        continue
+                    elif node.tag == qn("w:lastRenderedPageBreak") and after_manual_break:
+                        after_manual_break = False
+                    else:
+                        if text.strip():
+                            pages[-1].append(text)
+                        text = ""
+                        pages.append([])
+                        after_manual_break = node.tag == qn("w:br")
+                if text.strip():
+                    pages[-1].append(text)
+            elif tag == "tbl":
+                for row in block.xpath("./w:tr"):
+                    cells = ["".join(node.text or "" for node in cell.xpath(".//w:t")) for cell in row.xpath("./w:tc")]
+                    if any(cell.strip() for cell in cells):
+                        pages[-1].append(" | ".join(cells))
+                        after_manual_break = False
+
+        page_docs = []
+        for page_number, paragraphs in enumerate(pages, start=1):
+            page_doc = self._page_document("\n\n".join(paragraphs), document_name, page_number, "docx")
+            if page_doc:
+                page_docs.append(page_doc)
+        parser_stats.record_pages("docx", len(pages), sum(len(doc.page_content) for doc in page_docs), time.perf_counter() - started)
+        return page_docs
+
+    def _parse_pdf_pages(self, file_path: str, document_name: str, first_page: int, last_page: int) -> List[Document]:
+        reader = PdfReader(file_path)
+        page_docs = []
+        for page_number in range(first_page, last_page + 1):
+            started = time.perf_counter()
+            text = reader.pages[page_number - 1].extract_text() or ""
+            parser = "pdf_text"
+            # Pages without a usable text layer (scans, image-only pages) are the only ones sent to Tesseract.
+            if len(text.strip()) < settings.PDF_TEXT_LAYER_MIN_CHARS:
+                with timed_stage("parser", "ocr"):
+                    images = convert_from_path(file_path, dpi=settings.OCR_DPI, first_page=page_number, last_page=page_number)
+                    text = "\n\n".join(pytesseract.image_to_string(image, lang="eng") for image in images)
+                parser = "ocr"
+            page_doc = self._page_document(text, document_name, page_number, parser)
+            if page_doc:
+                page_docs.append(page_doc)
+            parser_stats.record_pages(parser, 1, len(text), time.perf_counter() - started)
+        return page_docs
+
+    def _partition_with_unstructured(self, file_path: str, document_name: str) -> List[Document]:
+        started = time.perf_counter()
+        try:
+            with timed_stage("parser", "partition"):
+                # Imported on first use: unstructured is slow to import, and the fast paths never need it.
+                from unstructured.partition.auto import partition
+
+                elements = partition(filename=file_path, strategy="auto", ocr_languages="eng") 
         except Exception as e:
             raise DocumentProcessingError(f"Failed to partition document {document_name}: {str(e)}")
 
+        split_docs = self._split_elements(elements, document_name)
+        pages = len({doc.metadata["page_number"] for doc in split_docs}) or 1
+        parser_stats.record_pages("unstructured", pages, sum(len(doc.page_content) for doc in split_docs), time.perf_counter() - started)
+        return split_docs
+
+    def _split_elements(self, elements: List[Any], document_name: str, page_offset: int = 0) -> List[Document]:
+        from unstructured.cleaners.core import clean
+
         chunks = []
         current_page_number = None
         doc_content = []
@@ -33,19 +279,21 @@ class DocumentProcessor:
             page_number_in_element = el.metadata.page_number if hasattr(el.metadata, 'page_number') else None
             
             if page_number_in_element is not None:
-                current_page_number = page_number_in_element
+                current_page_number = page_number_in_element + page_offset
             
             text = clean(el.text, bullets=True, extra_whitespace=True, dashes=True)
 
             if text.strip(): 
                 metadata = {
                     "document_name": document_name,
-                    "page_number": current_page_number if current_page_number is not None else 1, 
-                    "source_element_type": str(type(el).__name__)
+                    "page_number": current_page_number if current_page_number is not None else page_offset + 1, 
+                    "source_element_type": str(type(el).__name__),
+                    "parser": "unstructured"
                 }
                 doc_content.append(Document(page_content=text, metadata=metadata))
 
         if not doc_content:
              return [] 
-        split_docs = self.text_splitter.split_documents(doc_content)
-        return split_docs
\ No newline at end of file
+        with timed_stage("parser", "split"):
+            split_docs = self.text_splitter.split_documents(doc_content)
+        return split_docs
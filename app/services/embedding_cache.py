@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+from app.utils.helpers import hash_text
+
+class EmbeddingCache:
+    def __init__(self, path: str, model_name: str, max_entries: int):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.chunk_hits = 0
+        self.chunk_misses = 0
+        self.document_hits = 0
+        self.document_misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_embeddings ("
+            "chunk_hash TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (chunk_hash, model))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_embeddings_last_used ON chunk_embeddings (last_used)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_documents ("
+            "file_hash TEXT NOT NULL, model TEXT NOT NULL, document_id TEXT NOT NULL, "
+            "PRIMARY KEY (file_hash, model))"
+        )
+        self._entries = self._conn.execute(
+            "SELECT COUNT(*) FROM chunk_embeddings WHERE model = ?", (self.model_name,)
+        ).fetchone()[0]
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        hashes = [hash_text(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(hashes), 500):
+                batch = list(set(hashes[start:start + 500]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, vector FROM chunk_embeddings WHERE model = ? AND chunk_hash IN ({placeholders})",
+                    [self.model_name, *batch]
+                ).fetchall()
+                for chunk_hash, blob in rows:
+                    found[chunk_hash] = array("f", blob).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE chunk_embeddings SET last_used = ? WHERE chunk_hash = ? AND model = ?",
+                    [(now, chunk_hash, self.model_name) for chunk_hash in found]
+                )
+
+            vectors = [found.get(chunk_hash) for chunk_hash in hashes]
+            hits = sum(1 for vector in vectors if vector is not None)
+            self.chunk_hits += hits
+            self.chunk_misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        now = time.time()
+        rows = [(hash_text(text), self.model_name, array("f", vector).tobytes(), now) for text, vector in zip(texts, vectors)]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_embeddings (chunk_hash, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._entries += self._conn.total_changes - before
+            if self._entries > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        # Trim to 90% of the bound so eviction runs once per batch of inserts, not on every insert.
+        excess = self._entries - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM chunk_embeddings WHERE rowid IN ("
+            "SELECT rowid FROM chunk_embeddings WHERE model = ? ORDER BY last_used ASC LIMIT ?)",
+            (self.model_name, excess)
+        )
+        self._entries = self._conn.execute(
+            "SELECT COUNT(*) FROM chunk_embeddings WHERE model = ?", (self.model_name,)
+        ).fetchone()[0]
+
+    def lookup_document(self, file_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document_id FROM file_documents WHERE file_hash = ? AND model = ?",
+                (file_hash, self.model_name)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_document_lookup(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.document_hits += 1
+            else:
+                self.document_misses += 1
+
+    def remember_document(self, file_hash: str, document_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_documents (file_hash, model, document_id) VALUES (?, ?, ?)",
+                (file_hash, self.model_name, document_id)
+            )
+
+    def forget_document(self, document_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM file_documents WHERE document_id = ?", (document_id,))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.chunk_hits + self.chunk_misses
+            return {
+                "enabled": True,
+                "model": self.model_name,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "chunk_hits": self.chunk_hits,
+                "chunk_misses": self.chunk_misses,
+                "chunk_hit_rate": round(self.chunk_hits / lookups, 4) if lookups else 0.0,
+                "document_hits": self.document_hits,
+                "document_misses": self.document_misses,
+            }
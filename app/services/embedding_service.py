@@ -1,43 +1,435 @@
-from typing import List
+import os
+import shutil
+import sqlite3
+import threading
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import chromadb
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma  
 from app.core.config import settings
-from app.core.errors import EmbeddingError, DocumentNotFoundError
+from app.core.errors import EmbeddingError, DocumentNotFoundError, DocumentProcessingError, EmptyDocumentError
+from app.core.metrics import CHUNKS_EMBEDDED, EMBEDDING_CACHE_LOOKUPS, timed_stage
+from app.services.embedding_cache import EmbeddingCache
+from app.services.document_catalog import DocumentCatalog
+from app.services.store_lock import StoreLock
+from app.services.document_index import DocumentIndex, DocumentIndexCache
+from app.services.inference_backend import embedding_cache_key, embedding_model_source
+from app.utils.helpers import hash_text, is_uuid, directory_size
 
 class EmbeddingService:
-    def __init__(self):
+    def __init__(self, embedding_model: Optional[Embeddings] = None):
         try:
-            self.embedding_model = HuggingFaceEmbeddings(
-                model_name=settings.EMBEDDING_MODEL_NAME,
-                model_kwargs={'device': 'cpu'}, 
-                encode_kwargs={'normalize_embeddings': True} 
-            )
+            if embedding_model is None:
+                model_name, model_kwargs = embedding_model_source(settings.EMBEDDING_MODEL_NAME)
+                embedding_model = HuggingFaceEmbeddings(
+                    model_name=model_name,
+                    model_kwargs=model_kwargs, 
+                    encode_kwargs={'normalize_embeddings': True, 'batch_size': settings.ENCODE_BATCH_SIZE} 
+                )
+            self.embedding_model = embedding_model
         except Exception as e:
             raise EmbeddingError(f"Failed to load embedding model: {str(e)}")
 
         try:
+            self.chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
             self.vector_store = Chroma(
-                persist_directory=settings.CHROMA_PERSIST_DIRECTORY,
+                client=self.chroma_client,
                 embedding_function=self.embedding_model
             )
         except Exception as e:
             raise EmbeddingError(f"Failed to initialize ChromaDB: {str(e)}")
 
-    def embed_and_store_chunks(self, document_id: str, chunks: List[Document]):
+        try:
+            self.catalog = DocumentCatalog(settings.DOCUMENT_CATALOG_PATH)
+        except Exception as e:
+            raise EmbeddingError(f"Failed to open document catalog: {str(e)}")
+
+        self.per_document_collections = settings.CHROMA_COLLECTION_LAYOUT == "per_document"
+        self._document_stores: Dict[str, Chroma] = {}
+        self._stores_lock = threading.Lock()
+        # Chroma reads and writes hold it shared, compaction exclusively, across every process on this store.
+        self.store_lock = StoreLock(os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "store.lock"))
+        # Updates diff against the stored chunk set, so they must not interleave with each other or with deletes.
+        self._update_lock = threading.Lock()
+
+        self._document_listeners: List[Callable[[str], None]] = []
+
+        self.embedding_cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            try:
+                self.embedding_cache = EmbeddingCache(
+                    path=settings.EMBEDDING_CACHE_PATH,
+                    model_name=embedding_cache_key(settings.EMBEDDING_MODEL_NAME),
+                    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES
+                )
+            except Exception as e:
+                print(f"Warning: Failed to open embedding cache. Embeddings will not be cached. Error: {str(e)}")
+
+        self.index_cache = None
+        if settings.DOCUMENT_INDEX_CACHE_ENABLED:
+            self.index_cache = DocumentIndexCache(
+                loader=self._load_document_index,
+                max_bytes=settings.DOCUMENT_INDEX_CACHE_MAX_BYTES,
+                generation_of=self.document_generation
+            )
+            self.add_document_listener(self.index_cache.invalidate)
+
+    def warm_up(self):
+        self.embedding_model.embed_query("warm up")
+
+    def close(self):
+        if self.index_cache:
+            self.index_cache.close()
+
+    def embed_query(self, query: str) -> List[float]:
+        with timed_stage("embedding", "query_encode"):
+            return self.embedding_model.embed_query(query)
+
+    def add_document_listener(self, listener: Callable[[str], None]):
+        self._document_listeners.append(listener)
+
+    def document_generation(self, document_id: str) -> int:
+        return self.catalog.generation(document_id)
+
+    def _notify_document_changed(self, document_id: str):
+        # The catalog generation reaches caches in other processes; listeners only cover this one.
+        try:
+            self.catalog.bump_generation(document_id)
+        except Exception as e:
+            print(f"Warning: Could not advance the generation of document {document_id}. Error: {str(e)}")
+        for listener in self._document_listeners:
+            try:
+                listener(document_id)
+            except Exception as e:
+                print(f"Warning: Document change listener failed for document {document_id}. Error: {str(e)}")
+
+    def _collection_name(self, document_id: str) -> str:
+        return f"doc_{document_id}"
+
+    def _store_for(self, document_id: str, create: bool = False) -> Chroma:
+        if not self.per_document_collections:
+            return self.vector_store
+        with self._stores_lock:
+            store = self._document_stores.get(document_id)
+        if store is not None:
+            return store
+
+        name = self._collection_name(document_id)
+        if not create:
+            try:
+                self.chroma_client.get_collection(name)
+            except Exception:
+                # Documents embedded before the per-document layout was enabled live in the shared collection.
+                return self.vector_store
+        store = Chroma(client=self.chroma_client, collection_name=name, embedding_function=self.embedding_model)
+        with self._stores_lock:
+            self._document_stores[document_id] = store
+        return store
+
+    def _prepare_chunks(self, document_id: str, chunks: List[Document], first_index: int = 0) -> List[str]:
+        for chunk in chunks:
+            chunk.metadata["document_id"] = document_id
+            chunk.metadata["chunk_hash"] = hash_text(chunk.page_content)
+        return [f"{document_id}_{first_index + i}" for i in range(len(chunks))]
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not self.embedding_cache:
+            with timed_stage("embedding", "encode"):
+                return self.embedding_model.embed_documents(texts)
+
+        with timed_stage("embedding", "cache_lookup"):
+            embeddings = self.embedding_cache.get_many(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if settings.METRICS_ENABLED:
+            EMBEDDING_CACHE_LOOKUPS.labels("hit").inc(len(texts) - len(missing))
+            EMBEDDING_CACHE_LOOKUPS.labels("miss").inc(len(missing))
+        if missing:
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            with timed_stage("embedding", "encode"):
+                new_embeddings = self.embedding_model.embed_documents(unique_texts)
+            self.embedding_cache.put_many(unique_texts, new_embeddings)
+            by_text = dict(zip(unique_texts, new_embeddings))
+            for i in missing:
+                embeddings[i] = by_text[texts[i]]
+        return embeddings
+
+    def _store_batch(self, ids: List[str], chunks: List[Document], target_store: Optional[Chroma] = None):
+        # Encode explicitly and upsert precomputed vectors so one encode call can span many documents.
+        texts = [chunk.page_content for chunk in chunks]
+        embeddings = self._embed_texts(texts)
+
+        positions_by_document: Dict[str, List[int]] = {}
+        for i, chunk in enumerate(chunks):
+            positions_by_document.setdefault(chunk.metadata["document_id"], []).append(i)
+        with timed_stage("embedding", "store"), self.store_lock.shared():
+            for document_id, positions in positions_by_document.items():
+                (target_store or self._store_for(document_id, create=True))._collection.upsert(
+                    ids=[ids[i] for i in positions],
+                    embeddings=[embeddings[i] for i in positions],
+                    metadatas=[chunks[i].metadata for i in positions],
+                    documents=[texts[i] for i in positions]
+                )
+        if settings.METRICS_ENABLED:
+            CHUNKS_EMBEDDED.inc(len(chunks))
+
+    def _delete_document_chunks(self, document_id: str):
+        with self.store_lock.shared():
+            store = self._store_for(document_id)
+            if store is self.vector_store:
+                store._collection.delete(where={"document_id": document_id})
+                return
+            self.chroma_client.delete_collection(self._collection_name(document_id))
+            with self._stores_lock:
+                self._document_stores.pop(document_id, None)
+
+    def _get_stored_chunks(self, document_id: str, include: List[str]) -> Dict[str, Any]:
+        with self.store_lock.shared():
+            return self._store_for(document_id)._collection.get(where={"document_id": document_id}, include=include)
+
+    def embed_and_store_chunks(self, document_id: str, chunks: List[Document], progress_callback: Optional[Callable[[int], None]] = None):
         if not chunks:
             raise EmbeddingError("No chunks provided to embed.")
         try:
-            for chunk in chunks:
-                chunk.metadata["document_id"] = document_id
+            ids = self._prepare_chunks(document_id, chunks)
+            batch_size = settings.EMBED_BATCH_SIZE
+            for start in range(0, len(chunks), batch_size):
+                end = start + batch_size
+                self._store_batch(ids[start:end], chunks[start:end])
+                if progress_callback:
+                    progress_callback(min(end, len(chunks)))
+        except Exception as e:
+            raise EmbeddingError(f"Failed to embed and store chunks for document {document_id}: {str(e)}")
+        finally:
+            self._notify_document_changed(document_id)
 
-            self.vector_store.add_documents(documents=chunks, ids=[f"{document_id}_{i}" for i in range(len(chunks))])
+    def embed_and_store_stream(self, document_id: str, chunks: Iterable[Document], progress_callback: Optional[Callable[[int], None]] = None) -> int:
+        # Consumes chunks as they are produced so peak memory is one batch, not the whole document.
+        stored = 0
+        batch: List[Document] = []
+        try:
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) < settings.EMBED_BATCH_SIZE:
+                    continue
+                self._store_batch(self._prepare_chunks(document_id, batch, first_index=stored), batch)
+                stored += len(batch)
+                batch = []
+                if progress_callback:
+                    progress_callback(stored)
+            if batch:
+                self._store_batch(self._prepare_chunks(document_id, batch, first_index=stored), batch)
+                stored += len(batch)
+                if progress_callback:
+                    progress_callback(stored)
         except Exception as e:
+            try:
+                self._delete_document_chunks(document_id)
+            except Exception as cleanup_error:
+                print(f"Warning: Could not clean up partial chunks for document {document_id}. Error: {str(cleanup_error)}")
+            if isinstance(e, DocumentProcessingError):
+                raise
             raise EmbeddingError(f"Failed to embed and store chunks for document {document_id}: {str(e)}")
+        finally:
+            self._notify_document_changed(document_id)
+        return stored
+
+    def embed_and_store_many(self, documents: Dict[str, List[Document]]) -> Dict[str, str]:
+        pooled: List[Tuple[str, str, Document]] = []
+        for document_id, chunks in documents.items():
+            ids = self._prepare_chunks(document_id, chunks)
+            pooled.extend((document_id, chunk_id, chunk) for chunk_id, chunk in zip(ids, chunks))
+
+        failures: Dict[str, str] = {}
+        batch_size = settings.BULK_EMBED_BATCH_SIZE
+        for start in range(0, len(pooled), batch_size):
+            batch = [entry for entry in pooled[start:start + batch_size] if entry[0] not in failures]
+            if not batch:
+                continue
+            try:
+                self._store_batch([chunk_id for _, chunk_id, _ in batch], [chunk for _, _, chunk in batch])
+            except Exception:
+                # Retry the batch one document at a time so a bad file only fails itself.
+                by_document: Dict[str, List[Tuple[str, Document]]] = {}
+                for document_id, chunk_id, chunk in batch:
+                    by_document.setdefault(document_id, []).append((chunk_id, chunk))
+                for document_id, entries in by_document.items():
+                    try:
+                        self._store_batch([chunk_id for chunk_id, _ in entries], [chunk for _, chunk in entries])
+                    except Exception as e:
+                        failures[document_id] = f"Failed to embed and store chunks for document {document_id}: {str(e)}"
+
+        for document_id in failures:
+            try:
+                self._delete_document_chunks(document_id)
+            except Exception as e:
+                print(f"Warning: Could not clean up partial chunks for document {document_id}. Error: {str(e)}")
+        for document_id in documents:
+            self._notify_document_changed(document_id)
+        return failures
+
+    def reuse_existing_document(self, file_hash: str, document_id: str, document_name: str) -> int:
+        if not self.embedding_cache:
+            return 0
+        source_id = self.embedding_cache.lookup_document(file_hash)
+        stored = None
+        if source_id:
+            stored = self._get_stored_chunks(source_id, include=["embeddings", "metadatas", "documents"])
+            if not stored["ids"]:
+                self.embedding_cache.forget_document(source_id)
+                stored = None
+        self.embedding_cache.record_document_lookup(hit=stored is not None)
+        if stored is None:
+            return 0
+
+        try:
+            # Copy the stored vectors under the new id instead of re-partitioning and re-encoding the file.
+            ids = [f"{document_id}_{chunk_id.rsplit('_', 1)[-1]}" for chunk_id in stored["ids"]]
+            metadatas = [{**metadata, "document_id": document_id, "document_name": document_name} for metadata in stored["metadatas"]]
+            embeddings = [list(embedding) for embedding in stored["embeddings"]]
+            batch_size = settings.BULK_EMBED_BATCH_SIZE
+            with self.store_lock.shared():
+                target_store = self._store_for(document_id, create=True)
+                for start in range(0, len(ids), batch_size):
+                    end = start + batch_size
+                    target_store._collection.upsert(
+                        ids=ids[start:end],
+                        embeddings=embeddings[start:end],
+                        metadatas=metadatas[start:end],
+                        documents=stored["documents"][start:end]
+                    )
+        except Exception as e:
+            raise EmbeddingError(f"Failed to reuse stored chunks of document {source_id} for document {document_id}: {str(e)}")
+        finally:
+            self._notify_document_changed(document_id)
+        return len(ids)
+
+    def update_document(self, document_id: str, document_name: str, chunks: Iterable[Document], file_hash: Optional[str] = None) -> Dict[str, int]:
+        with self._update_lock:
+            # Legacy documents may sit in the shared collection under the per-document layout; keep them there.
+            store = self._store_for(document_id)
+            try:
+                stored = self._get_stored_chunks(document_id, include=["metadatas", "documents"])
+            except Exception as e:
+                raise EmbeddingError(f"Failed to look up document {document_id}: {str(e)}")
+            if not stored["ids"]:
+                raise DocumentNotFoundError(f"Document ID {document_id} not found.")
+
+            stored_ids_by_hash: Dict[str, List[str]] = {}
+            stored_metadatas: Dict[str, Dict[str, Any]] = {}
+            next_index = 0
+            for chunk_id, metadata, text in zip(stored["ids"], stored["metadatas"], stored["documents"]):
+                # Chunks stored before chunk hashing was added are hashed from their text.
+                chunk_hash = (metadata or {}).get("chunk_hash") or hash_text(text)
+                stored_ids_by_hash.setdefault(chunk_hash, []).append(chunk_id)
+                stored_metadatas[chunk_id] = metadata or {}
+                suffix = chunk_id.rsplit("_", 1)[-1]
+                if suffix.isdigit():
+                    next_index = max(next_index, int(suffix) + 1)
+
+            reused = 0
+            added_ids: List[str] = []
+            refreshed_ids: List[str] = []
+            chunk_iter = iter(chunks)
+            try:
+                while True:
+                    batch = list(islice(chunk_iter, settings.EMBED_BATCH_SIZE))
+                    if not batch:
+                        break
+                    self._prepare_chunks(document_id, batch)
+                    changed_ids, changed_metadatas, new_chunks = [], [], []
+                    for chunk in batch:
+                        matches = stored_ids_by_hash.get(chunk.metadata["chunk_hash"])
+                        if not matches:
+                            new_chunks.append(chunk)
+                            continue
+                        chunk_id = matches.pop(0)
+                        reused += 1
+                        # Same text, but page numbers or offsets may have shifted; refresh metadata without re-encoding.
+                        if stored_metadatas[chunk_id] != chunk.metadata:
+                            changed_ids.append(chunk_id)
+                            changed_metadatas.append(chunk.metadata)
+                    if changed_ids:
+                        refreshed_ids.extend(changed_ids)
+                        with self.store_lock.shared():
+                            store._collection.update(ids=changed_ids, metadatas=changed_metadatas)
+                    if new_chunks:
+                        ids = [f"{document_id}_{next_index + i}" for i in range(len(new_chunks))]
+                        next_index += len(new_chunks)
+                        self._store_batch(ids, new_chunks, target_store=store)
+                        added_ids.extend(ids)
+                if not reused and not added_ids:
+                    raise EmptyDocumentError()
+
+                removed_ids = [chunk_id for chunk_ids in stored_ids_by_hash.values() for chunk_id in chunk_ids]
+                if removed_ids:
+                    # One call, so Chroma applies it in a single transaction: if it fails nothing was removed and
+                    # the rollback below leaves the old version; if it succeeds only the new version remains.
+                    with self.store_lock.shared():
+                        store._collection.delete(ids=removed_ids)
+            except Exception as e:
+                # Undo what this update wrote so the document is left exactly as it was.
+                if refreshed_ids:
+                    self._restore_metadatas(store, document_id, refreshed_ids, stored_metadatas)
+                if added_ids:
+                    try:
+                        with self.store_lock.shared():
+                            store._collection.delete(ids=added_ids)
+                    except Exception as cleanup_error:
+                        print(f"Warning: Could not roll back new chunks of document {document_id}. Error: {str(cleanup_error)}")
+                if isinstance(e, (DocumentProcessingError, EmptyDocumentError)):
+                    raise
+                raise EmbeddingError(f"Failed to update chunks for document {document_id}: {str(e)}")
+            finally:
+                self._notify_document_changed(document_id)
+
+        # The old file hash no longer describes this document's content.
+        if self.embedding_cache:
+            self.embedding_cache.forget_document(document_id)
+            if file_hash:
+                self.embedding_cache.remember_document(file_hash, document_id)
+        self.catalog.update_name(document_id, document_name)
+        return {"chunks_reused": reused, "chunks_embedded": len(added_ids), "chunks_deleted": len(removed_ids)}
+
+    def _restore_metadatas(self, store: Chroma, document_id: str, chunk_ids: List[str], previous: Dict[str, Dict[str, Any]]):
+        try:
+            with self.store_lock.shared():
+                current = store._collection.get(ids=chunk_ids, include=["metadatas"])
+                # Chroma merges metadata on update, so keys the refresh added have to be cleared explicitly.
+                metadatas = {
+                    chunk_id: {**{key: None for key in (metadata or {}) if key not in previous[chunk_id]}, **previous[chunk_id]}
+                    for chunk_id, metadata in zip(current["ids"], current["metadatas"])
+                }
+                store._collection.update(ids=list(metadatas), metadatas=list(metadatas.values()))
+        except Exception as e:
+            print(f"Warning: Could not restore metadata of reused chunks of document {document_id}. Error: {str(e)}")
+
+    def remember_document_file(self, file_hash: str, document_id: str):
+        if self.embedding_cache:
+            self.embedding_cache.remember_document(file_hash, document_id)
+
+    def record_document(self, document_id: str, document_name: str, collection: Optional[str] = None, file_hash: Optional[str] = None):
+        # Called once a document's chunks are stored, whichever ingestion path produced them.
+        if file_hash:
+            self.remember_document_file(file_hash, document_id)
+        self.catalog.register(document_id, document_name, collection)
+
+    def documents_in_collection(self, collection: str) -> List[str]:
+        return self.catalog.document_ids(collection)
+
+    def collections(self) -> Dict[str, int]:
+        return self.catalog.collections()
+
+    def cache_stats(self) -> Dict:
+        if not self.embedding_cache:
+            return {"enabled": False}
+        return self.embedding_cache.stats()
 
     def get_retriever(self, document_id: str, k_results: int = 5):
         try:
-            retriever = self.vector_store.as_retriever(
+            retriever = self._store_for(document_id).as_retriever(
                 search_type="similarity",
                 search_kwargs={
                     'k': k_results,
@@ -46,4 +438,93 @@ class EmbeddingService:
             )
             return retriever 
         except Exception as e: 
-             raise DocumentNotFoundError(f"Could not create retriever or find document ID {document_id}. Ensure it's embedded. Original error: {e}")
\ No newline at end of file
+             raise DocumentNotFoundError(f"Could not create retriever or find document ID {document_id}. Ensure it's embedded. Original error: {e}")
+
+    def _load_document_index(self, document_id: str) -> Optional[DocumentIndex]:
+        stored = self._get_stored_chunks(document_id, include=["embeddings", "metadatas", "documents"])
+        if not stored["ids"]:
+            return None
+        return DocumentIndex(
+            document_id=document_id,
+            embeddings=stored["embeddings"],
+            texts=stored["documents"],
+            metadatas=stored["metadatas"]
+        )
+
+    def index_stats(self) -> Dict:
+        if not self.index_cache:
+            return {"enabled": False}
+        return self.index_cache.stats()
+
+    def search_by_vector(self, document_id: str, query_embedding: List[float], k_results: int = 5) -> List[Document]:
+        if self.index_cache:
+            with timed_stage("retrieval", "index_search"):
+                docs = self.index_cache.search(document_id, query_embedding, k_results)
+            if docs is not None:
+                return docs
+        try:
+            with timed_stage("retrieval", "chroma_search"), self.store_lock.shared():
+                return self._store_for(document_id).similarity_search_by_vector(
+                    embedding=query_embedding,
+                    k=k_results,
+                    filter={'document_id': document_id}
+                )
+        except Exception as e:
+            raise DocumentNotFoundError(f"Could not search document ID {document_id}. Ensure it's embedded. Original error: {e}")
+
+    def document_exists(self, document_id: str) -> bool:
+        with self.store_lock.shared():
+            return bool(self._store_for(document_id)._collection.get(where={"document_id": document_id}, limit=1, include=[])["ids"])
+
+    def count_chunks(self, document_id: str) -> int:
+        return len(self._get_stored_chunks(document_id, include=[])["ids"])
+
+    def delete_document(self, document_id: str):
+        # Serialized with updates, so a delete cannot land between an update's diff and its writes.
+        with self._update_lock:
+            try:
+                exists = self.document_exists(document_id)
+            except Exception as e:
+                raise EmbeddingError(f"Failed to look up document {document_id}: {str(e)}")
+            if not exists:
+                raise DocumentNotFoundError(f"Document ID {document_id} not found.")
+
+            try:
+                self._delete_document_chunks(document_id)
+            except Exception as e:
+                raise EmbeddingError(f"Failed to delete document {document_id}: {str(e)}")
+        if self.embedding_cache:
+            self.embedding_cache.forget_document(document_id)
+        self.catalog.forget(document_id)
+        self._notify_document_changed(document_id)
+
+    def compact(self, sweep_segments: bool = False) -> Dict[str, Any]:
+        persist_dir = settings.CHROMA_PERSIST_DIRECTORY
+        sqlite_path = os.path.join(persist_dir, "chroma.sqlite3")
+        with self.store_lock.exclusive():
+            bytes_before = directory_size(persist_dir)
+            conn = sqlite3.connect(sqlite_path, timeout=30, isolation_level=None)
+            removed_segments = 0
+            try:
+                if sweep_segments:
+                    # Relies on Chroma internals (the segments table and HNSW directories named by segment id),
+                    # which is why it is opt-in and chromadb is pinned.
+                    live_segments = {row[0] for row in conn.execute("SELECT id FROM segments")}
+                    for entry in os.scandir(persist_dir):
+                        if entry.is_dir() and is_uuid(entry.name) and entry.name not in live_segments:
+                            shutil.rmtree(entry.path, ignore_errors=True)
+                            removed_segments += 1
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.execute("VACUUM")
+            except Exception as e:
+                raise EmbeddingError(f"Failed to compact ChromaDB store: {str(e)}")
+            finally:
+                conn.close()
+            bytes_after = directory_size(persist_dir)
+
+        return {
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "bytes_reclaimed": max(bytes_before - bytes_after, 0),
+            "orphaned_segments_removed": removed_segments
+        }
\ No newline at end of file
@@ -0,0 +1,60 @@
+import re
+from typing import Any, Dict, List
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from app.utils.helpers import estimate_tokens, CHARS_PER_TOKEN
+
+class HistoryPacker:
+    def __init__(self, token_budget: int, summary_max_tokens: int):
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+
+    def pack(self, history: List[Dict[str, str]]) -> List[Any]:
+        kept_count = 0
+        used_tokens = 0
+        for entry in reversed(history):
+            cost = estimate_tokens(entry["content"])
+            if used_tokens + cost > self.token_budget:
+                break
+            used_tokens += cost
+            kept_count += 1
+
+        kept = history[len(history) - kept_count:] if kept_count else []
+        # Never open the verbatim window with an orphaned assistant reply.
+        while kept and kept[0]["role"] != "user":
+            kept = kept[1:]
+        older = history[:len(history) - len(kept)]
+
+        messages = []
+        if older:
+            messages.append(SystemMessage(content=self._summarize(older)))
+        for entry in kept:
+            if entry["role"] == "user":
+                messages.append(HumanMessage(content=entry["content"]))
+            elif entry["role"] == "assistant":
+                messages.append(AIMessage(content=entry["content"]))
+        return messages
+
+    def _summarize(self, older: List[Dict[str, str]]) -> str:
+        # Extractive rather than LLM-generated so packing never adds a Gemini round trip.
+        lines = []
+        for entry in older:
+            text = re.sub(r"\s+", " ", entry["content"]).strip()
+            if entry["role"] == "user":
+                lines.append(f"User asked: {self._truncate(text, 160)}")
+            elif entry["role"] == "assistant":
+                first_sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+                lines.append(f"Assistant answered: {self._truncate(first_sentence, 200)}")
+
+        header = "Summary of earlier conversation turns (oldest first):"
+        budget_chars = self.summary_max_tokens * CHARS_PER_TOKEN - len(header)
+        selected = []
+        for line in reversed(lines):
+            if len(line) + 1 > budget_chars:
+                break
+            selected.append(line)
+            budget_chars -= len(line) + 1
+        selected.reverse()
+        return "\n".join([header, *selected])
+
+    def _truncate(self, text: str, max_chars: int) -> str:
+        return text if len(text) <= max_chars else text[:max_chars - 3].rstrip() + "..."
@@ -0,0 +1,91 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+
+TORCH_BACKEND = "torch"
+ONNX_BACKEND = "onnx"
+QUANTIZATION_CONFIGS = {"none", "arm64", "avx2", "avx512", "avx512_vnni"}
+
+_export_lock = threading.Lock()
+
+def _resolve(backend: Optional[str], quantization: Optional[str]) -> Tuple[str, str]:
+    backend = (backend or settings.INFERENCE_BACKEND).lower()
+    quantization = (quantization or settings.ONNX_QUANTIZATION).lower()
+    if backend not in (TORCH_BACKEND, ONNX_BACKEND):
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}'. Use '{TORCH_BACKEND}' or '{ONNX_BACKEND}'.")
+    if quantization not in QUANTIZATION_CONFIGS:
+        raise ValueError(f"Unknown ONNX_QUANTIZATION '{quantization}'. Use one of: {', '.join(sorted(QUANTIZATION_CONFIGS))}.")
+    return backend, quantization
+
+def _onnx_file_name(quantization: str) -> str:
+    if quantization == "none":
+        return "onnx/model.onnx"
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+def _onnx_model_kwargs(quantization: str) -> Dict[str, Any]:
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    if settings.ONNX_NUM_THREADS > 0:
+        session_options.intra_op_num_threads = settings.ONNX_NUM_THREADS
+        # Each request is a single graph run, so parallel operators only add scheduling overhead.
+        session_options.inter_op_num_threads = 1
+    return {
+        "file_name": _onnx_file_name(quantization),
+        "provider": "CPUExecutionProvider",
+        "session_options": session_options,
+    }
+
+def _ensure_onnx_export(model_cls: Any, model_name: str, quantization: str) -> str:
+    export_dir = os.path.join(settings.ONNX_MODEL_DIR, model_name.replace("/", "__"))
+    # Exporting and quantizing takes a while; the result is reused by every later start.
+    with _export_lock:
+        if os.path.exists(os.path.join(export_dir, _onnx_file_name(quantization))):
+            return export_dir
+        print(f"Exporting {model_name} to ONNX in {export_dir} (quantization: {quantization}).")
+        if not os.path.exists(os.path.join(export_dir, _onnx_file_name("none"))):
+            model = model_cls(model_name, device="cpu", backend="onnx")
+            model.save_pretrained(export_dir)
+        if quantization != "none":
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            model = model_cls(export_dir, device="cpu", backend="onnx")
+            export_dynamic_quantized_onnx_model(model, quantization, export_dir)
+        if not os.path.exists(os.path.join(export_dir, _onnx_file_name(quantization))):
+            raise RuntimeError(f"ONNX export of {model_name} did not produce {_onnx_file_name(quantization)}.")
+    return export_dir
+
+def embedding_model_source(model_name: str, backend: Optional[str] = None, quantization: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    # Returns the (model_name, model_kwargs) pair to hand to HuggingFaceEmbeddings.
+    backend, quantization = _resolve(backend, quantization)
+    if backend == TORCH_BACKEND:
+        return model_name, {"device": "cpu"}
+
+    from sentence_transformers import SentenceTransformer
+
+    export_dir = _ensure_onnx_export(SentenceTransformer, model_name, quantization)
+    return export_dir, {"device": "cpu", "backend": "onnx", "model_kwargs": _onnx_model_kwargs(quantization)}
+
+def load_cross_encoder(model_name: str, backend: Optional[str] = None, quantization: Optional[str] = None) -> Any:
+    from sentence_transformers.cross_encoder import CrossEncoder
+
+    backend, quantization = _resolve(backend, quantization)
+    if backend == TORCH_BACKEND:
+        return CrossEncoder(model_name_or_path=model_name, max_length=512, device="cpu")
+
+    export_dir = _ensure_onnx_export(CrossEncoder, model_name, quantization)
+    return CrossEncoder(
+        model_name_or_path=export_dir,
+        max_length=512,
+        device="cpu",
+        backend="onnx",
+        model_kwargs=_onnx_model_kwargs(quantization)
+    )
+
+def embedding_cache_key(model_name: str, backend: Optional[str] = None, quantization: Optional[str] = None) -> str:
+    # Quantized vectors differ slightly from full-precision ones, so they must not share cache entries.
+    backend, quantization = _resolve(backend, quantization)
+    if backend == TORCH_BACKEND:
+        return model_name
+    return f"{model_name}@onnx-{quantization}"
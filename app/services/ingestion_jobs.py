@@ -0,0 +1,374 @@
+import asyncio
+import multiprocessing
+from collections import deque
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from langchain_core.documents import Document
+from app.core.config import settings
+from app.core.errors import IngestionQueueFullError, IngestionQueueOverflowError, JobNotFoundError, EmptyDocumentError
+from app.core.metrics import timed_stage
+from app.services.document_processor import DocumentProcessor, parser_stats
+from app.services.embedding_service import EmbeddingService
+from app.utils.helpers import generate_unique_id, compute_file_hash
+
+JOB_STATUSES = ("queued", "parsing", "embedding", "done", "failed")
+
+_worker_processor: Optional[DocumentProcessor] = None
+
+def _error_message(error: BaseException) -> str:
+    return getattr(error, "detail", None) or str(error)
+
+def _get_worker_processor() -> DocumentProcessor:
+    # Runs inside a pool process; the processor is built once per worker.
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DocumentProcessor()
+    return _worker_processor
+
+def _parse_in_worker(file_path: str, document_name: str) -> Tuple[List[Document], Dict]:
+    chunks = _get_worker_processor().process_document(file_path=file_path, document_name=document_name)
+    return chunks, parser_stats.drain()
+
+def _parse_pages_in_worker(file_path: str, document_name: str, first_page: int, last_page: int) -> Tuple[List[Document], Dict]:
+    chunks = _get_worker_processor().process_page_range(file_path, document_name, first_page, last_page)
+    return chunks, parser_stats.drain()
+
+
+class IngestionJob:
+    def __init__(self, document_name: str, file_path: str, temp_dir: str, collection: Optional[str] = None):
+        self.job_id = generate_unique_id()
+        self.document_id = generate_unique_id()
+        self.document_name = document_name
+        self.collection = collection
+        self.file_path = file_path
+        self.temp_dir = temp_dir
+        self.status = "queued"
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.pages_total = 0
+        self.pages_parsed = 0
+        self.deduplicated = False
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def set_status(self, status: str):
+        self.status = status
+        self.updated_at = time.time()
+
+    def record_progress(self, chunks_embedded: int):
+        self.chunks_embedded = chunks_embedded
+        self.updated_at = time.time()
+
+    def record_pages_parsed(self, pages_parsed: int):
+        self.pages_parsed = pages_parsed
+        # Streamed jobs parse and embed at the same time; once every page is parsed only embedding is left.
+        if self.status == "parsing" and self.pages_total and pages_parsed >= self.pages_total:
+            self.status = "embedding"
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "document_id": self.document_id,
+            "document_name": self.document_name,
+            "collection": self.collection,
+            "status": self.status,
+            "chunks_total": self.chunks_total,
+            "chunks_embedded": self.chunks_embedded,
+            "pages_total": self.pages_total,
+            "pages_parsed": self.pages_parsed,
+            "deduplicated": self.deduplicated,
+            "error": self.error,
+        }
+
+
+class IngestionJobManager:
+    def __init__(self):
+        self.jobs: Dict[str, IngestionJob] = {}
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._embed_pool: Optional[ThreadPoolExecutor] = None
+        self._stream_pool: Optional[ThreadPoolExecutor] = None
+        self._parse_slots: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+        self._stopped = False
+
+    def start(self):
+        # "spawn" keeps workers from inheriting the parent's loaded torch state.
+        self._parse_pool = ProcessPoolExecutor(
+            max_workers=settings.INGESTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._embed_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion-embed")
+        # Streamed documents wait on parse results between batches, so they get their own threads instead of the shared embed thread.
+        self._stream_pool = ThreadPoolExecutor(max_workers=settings.INGESTION_WORKERS, thread_name_prefix="ingestion-stream")
+        self._parse_slots = asyncio.Semaphore(settings.INGESTION_WORKERS)
+        self._stopped = False
+
+    def shutdown(self, wait: bool = False):
+        # wait=True blocks until the parser processes have exited (and been reaped).
+        self._stopped = True
+        for task in list(self._tasks):
+            task.cancel()
+        if self._parse_pool:
+            self._parse_pool.shutdown(wait=wait, cancel_futures=True)
+        if self._embed_pool:
+            self._embed_pool.shutdown(wait=False, cancel_futures=True)
+        if self._stream_pool:
+            self._stream_pool.shutdown(wait=False, cancel_futures=True)
+
+    def ensure_capacity(self, count: int = 1):
+        if self._pending >= settings.INGESTION_MAX_QUEUE_SIZE:
+            raise IngestionQueueFullError()
+        overflow = self._pending + count - settings.INGESTION_MAX_QUEUE_SIZE
+        if overflow > 0:
+            raise IngestionQueueOverflowError(
+                f"Request has {count} documents but only {count - overflow} ingestion queue slots are free "
+                f"({overflow} over INGESTION_MAX_QUEUE_SIZE={settings.INGESTION_MAX_QUEUE_SIZE})."
+            )
+
+    def submit(self, file_path: str, temp_dir: str, document_name: str, embedding_service: EmbeddingService, collection: Optional[str] = None) -> IngestionJob:
+        self.ensure_capacity()
+        job = IngestionJob(document_name=document_name, file_path=file_path, temp_dir=temp_dir, collection=collection)
+        self.jobs[job.job_id] = job
+        self._pending += 1
+
+        task = asyncio.create_task(self._run(job, embedding_service))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._prune_finished()
+        return job
+
+    def get(self, job_id: str) -> IngestionJob:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError()
+        return job
+
+    async def parse(self, file_path: str, document_name: str, on_start: Optional[Callable[[], None]] = None) -> List[Document]:
+        # Callers wait here (still "queued") until a parser process is free.
+        async with self._parse_slots:
+            if on_start:
+                on_start()
+            loop = asyncio.get_running_loop()
+            with timed_stage("ingestion", "parse"):
+                chunks, worker_stats = await loop.run_in_executor(self._parse_pool, _parse_in_worker, file_path, document_name)
+        parser_stats.merge(worker_stats)
+        return chunks
+
+    def _acquire_parse_slot(self, loop: asyncio.AbstractEventLoop):
+        # Called from a streaming thread; polls so the thread can exit if the manager shuts down meanwhile.
+        acquired = asyncio.run_coroutine_threadsafe(self._parse_slots.acquire(), loop)
+        while True:
+            try:
+                acquired.result(timeout=1)
+                return
+            except FutureTimeoutError:
+                if self._stopped or loop.is_closed():
+                    acquired.cancel()
+                    raise RuntimeError("Ingestion manager is shutting down.")
+
+    def iter_pdf_chunks(self, file_path: str, document_name: str, page_count: int, loop: asyncio.AbstractEventLoop, on_pages_parsed: Optional[Callable[[int], None]] = None) -> Iterator[Document]:
+        per_task = settings.STREAMING_PAGES_PER_TASK
+        ranges = iter([(first, min(first + per_task - 1, page_count)) for first in range(1, page_count + 1, per_task)])
+        in_flight = deque()
+
+        def release_slot(_future):
+            loop.call_soon_threadsafe(self._parse_slots.release)
+
+        def submit_next() -> bool:
+            page_range = next(ranges, None)
+            if page_range is None:
+                return False
+            # Every in-flight range keeps a parser process busy, so each one holds its own parse slot.
+            self._acquire_parse_slot(loop)
+            try:
+                future = self._parse_pool.submit(_parse_pages_in_worker, file_path, document_name, *page_range)
+            except BaseException:
+                release_slot(None)
+                raise
+            future.add_done_callback(release_slot)
+            in_flight.append((page_range, future))
+            return True
+
+        # Only a bounded window of page ranges is parsed ahead of the consumer, so memory does not scale with page count.
+        try:
+            for _ in range(settings.STREAMING_MAX_IN_FLIGHT_RANGES):
+                if not submit_next():
+                    break
+            while in_flight:
+                (_, last_page), future = in_flight.popleft()
+                chunks, worker_stats = future.result()
+                parser_stats.merge(worker_stats)
+                submit_next()
+                if on_pages_parsed:
+                    on_pages_parsed(last_page)
+                yield from chunks
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+
+    async def ingest_streaming(self, file_path: str, document_id: str, document_name: str, page_count: int, embedding_service: EmbeddingService, job: Optional[IngestionJob] = None) -> int:
+        loop = asyncio.get_running_loop()
+        chunks = self.iter_pdf_chunks(file_path, document_name, page_count, loop, on_pages_parsed=job.record_pages_parsed if job else None)
+        return await loop.run_in_executor(
+            self._stream_pool,
+            embedding_service.embed_and_store_stream,
+            document_id, chunks, job.record_progress if job else None
+        )
+
+    async def update_document(self, file_path: str, document_id: str, document_name: str, embedding_service: EmbeddingService) -> Dict[str, int]:
+        # Updates parse and embed like uploads, so they count toward the same queue bound.
+        self.ensure_capacity()
+        self._pending += 1
+        try:
+            return await self._update_document(file_path, document_id, document_name, embedding_service)
+        finally:
+            self._pending -= 1
+
+    async def _update_document(self, file_path: str, document_id: str, document_name: str, embedding_service: EmbeddingService) -> Dict[str, int]:
+        loop = asyncio.get_running_loop()
+        file_hash = await loop.run_in_executor(None, compute_file_hash, file_path)
+        page_count = await loop.run_in_executor(None, DocumentProcessor.count_pdf_pages, file_path)
+        if page_count >= settings.STREAMING_MIN_PAGES:
+            chunks = self.iter_pdf_chunks(file_path, document_name, page_count, loop)
+            return await loop.run_in_executor(
+                self._stream_pool, embedding_service.update_document, document_id, document_name, chunks, file_hash
+            )
+        chunks = await self.parse(file_path, document_name)
+        return await loop.run_in_executor(
+            self._embed_pool, embedding_service.update_document, document_id, document_name, chunks, file_hash
+        )
+
+    async def reuse_duplicate(self, file_path: str, document_id: str, document_name: str, embedding_service: EmbeddingService) -> Tuple[str, int]:
+        loop = asyncio.get_running_loop()
+        file_hash = await loop.run_in_executor(None, compute_file_hash, file_path)
+        reused = await loop.run_in_executor(
+            self._embed_pool, embedding_service.reuse_existing_document, file_hash, document_id, document_name
+        )
+        return file_hash, reused
+
+    async def _parse_unless_duplicate(self, file_path: str, document_id: str, document_name: str, embedding_service: EmbeddingService) -> Tuple[str, int, List[Document]]:
+        file_hash, reused = await self.reuse_duplicate(file_path, document_id, document_name, embedding_service)
+        if reused:
+            return file_hash, reused, []
+        return file_hash, 0, await self.parse(file_path, document_name)
+
+    async def ingest_bulk(self, uploads: List[Tuple[str, str]], embedding_service: EmbeddingService, collection: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Bulk files count toward the same queue bound as background jobs while they are in flight.
+        self.ensure_capacity(len(uploads))
+        self._pending += len(uploads)
+        try:
+            return await self._ingest_bulk(uploads, embedding_service, collection)
+        finally:
+            self._pending -= len(uploads)
+
+    async def _ingest_bulk(self, uploads: List[Tuple[str, str]], embedding_service: EmbeddingService, collection: Optional[str] = None) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        document_ids = [generate_unique_id() for _ in uploads]
+        parsed = await asyncio.gather(
+            *(
+                self._parse_unless_duplicate(file_path, document_id, document_name, embedding_service)
+                for (file_path, document_name), document_id in zip(uploads, document_ids)
+            ),
+            return_exceptions=True
+        )
+
+        results = []
+        pending: Dict[str, List[Document]] = {}
+        file_hashes: Dict[str, str] = {}
+        document_names: Dict[str, str] = {}
+        for (_, document_name), document_id, outcome in zip(uploads, document_ids, parsed):
+            result = {"file_name": document_name, "status": "error", "document_id": None, "chunks": 0, "error": None}
+            if isinstance(outcome, BaseException):
+                result["error"] = _error_message(outcome)
+            else:
+                file_hash, reused, chunks = outcome
+                if reused:
+                    await loop.run_in_executor(None, embedding_service.record_document, document_id, document_name, collection, file_hash)
+                    result.update(status="success", document_id=document_id, chunks=reused)
+                elif not chunks:
+                    result["error"] = EmptyDocumentError().detail
+                else:
+                    pending[document_id] = chunks
+                    file_hashes[document_id] = file_hash
+                    document_names[document_id] = document_name
+                    result.update(status="success", document_id=document_id, chunks=len(chunks))
+            results.append(result)
+
+        if pending:
+            try:
+                failures = await loop.run_in_executor(self._embed_pool, embedding_service.embed_and_store_many, pending)
+            except Exception as e:
+                failures = {document_id: _error_message(e) for document_id in pending}
+            for result in results:
+                if result["document_id"] in failures:
+                    result.update(status="error", error=failures[result["document_id"]], document_id=None, chunks=0)
+            for document_id, file_hash in file_hashes.items():
+                if document_id not in failures:
+                    await loop.run_in_executor(None, embedding_service.record_document, document_id, document_names[document_id], collection, file_hash)
+        return results
+
+    async def _run(self, job: IngestionJob, embedding_service: EmbeddingService):
+        loop = asyncio.get_running_loop()
+        try:
+            file_hash, reused = await self.reuse_duplicate(job.file_path, job.document_id, job.document_name, embedding_service)
+            if reused:
+                await loop.run_in_executor(None, embedding_service.record_document, job.document_id, job.document_name, job.collection, file_hash)
+                job.deduplicated = True
+                job.chunks_total = reused
+                job.record_progress(reused)
+                job.set_status("done")
+                return
+
+            job.pages_total = await loop.run_in_executor(None, DocumentProcessor.count_pdf_pages, job.file_path)
+            if job.pages_total >= settings.STREAMING_MIN_PAGES:
+                # Parsing and embedding overlap here; chunks_embedded grows while pages are still being parsed.
+                job.set_status("parsing")
+                stored = await self.ingest_streaming(
+                    job.file_path, job.document_id, job.document_name, job.pages_total, embedding_service, job=job
+                )
+                if not stored:
+                    raise EmptyDocumentError()
+                job.chunks_total = stored
+                await loop.run_in_executor(None, embedding_service.record_document, job.document_id, job.document_name, job.collection, file_hash)
+                job.set_status("done")
+                return
+
+            chunks = await self.parse(job.file_path, job.document_name, on_start=lambda: job.set_status("parsing"))
+            if not chunks:
+                raise EmptyDocumentError()
+
+            job.chunks_total = len(chunks)
+            job.set_status("embedding")
+            await loop.run_in_executor(
+                self._embed_pool,
+                embedding_service.embed_and_store_chunks,
+                job.document_id, chunks, job.record_progress
+            )
+            await loop.run_in_executor(None, embedding_service.record_document, job.document_id, job.document_name, job.collection, file_hash)
+            job.set_status("done")
+        except Exception as e:
+            job.error = _error_message(e)
+            job.set_status("failed")
+            print(f"Warning: Ingestion job {job.job_id} for {job.document_name} failed. Error: {job.error}")
+        finally:
+            self._pending -= 1
+            shutil.rmtree(job.temp_dir, ignore_errors=True)
+
+    def _prune_finished(self):
+        overflow = len(self.jobs) - settings.INGESTION_JOB_RETENTION
+        if overflow <= 0:
+            return
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished][:overflow]:
+            del self.jobs[job_id]
+
+
+ingestion_jobs = IngestionJobManager()
@@ -0,0 +1,50 @@
+import time
+from typing import Any, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from app.services.document_processor import DocumentProcessor
+from app.services.embedding_service import EmbeddingService
+from app.services.qa_service import QAService
+from app.core.errors import ServiceNotReadyError
+
+class ModelRegistry:
+    def __init__(self):
+        self.document_processor: Optional[DocumentProcessor] = None
+        self.embedding_service: Optional[EmbeddingService] = None
+        self.qa_service: Optional[QAService] = None
+        self.ready = False
+        self.load_error: Optional[str] = None
+        self.warmup_seconds: Optional[float] = None
+
+    def load(self, embedding_model: Optional[Embeddings] = None, llm: Optional[BaseChatModel] = None, reranker: Optional[Any] = None):
+        start = time.perf_counter()
+        try:
+            self.document_processor = DocumentProcessor()
+            self.embedding_service = EmbeddingService(embedding_model=embedding_model)
+            self.qa_service = QAService(embedding_service=self.embedding_service, llm=llm, reranker=reranker)
+
+            self.embedding_service.warm_up()
+            self.qa_service.warm_up()
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"Error: Model registry failed to load. Error: {self.load_error}")
+            return
+
+        self.warmup_seconds = round(time.perf_counter() - start, 3)
+        self.ready = True
+        print(f"Model registry ready in {self.warmup_seconds}s.")
+
+    def shutdown(self):
+        if self.qa_service:
+            self.qa_service.close()
+        if self.embedding_service:
+            self.embedding_service.close()
+
+    def require_ready(self):
+        if self.load_error:
+            raise ServiceNotReadyError(f"Model loading failed: {self.load_error}")
+        if not self.ready:
+            raise ServiceNotReadyError()
+
+
+model_registry = ModelRegistry()
@@ -1,37 +1,120 @@
+import asyncio
+import contextvars
+import functools
+import logging
 import os
-from typing import Dict, List, Tuple, Any
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from sentence_transformers.cross_encoder import CrossEncoder
+from langchain_core.messages import SystemMessage
+from langchain_core.messages.ai import add_usage
+from langchain_core.language_models import BaseChatModel
 from app.core.config import settings
 from app.services.embedding_service import EmbeddingService
-from app.core.errors import QueryError, InvalidConversationIDError, DocumentNotFoundError
+from app.services.answer_cache import AnswerCache, normalize_query
+from app.services.conversation_store import create_conversation_store
+from app.services.history_packer import HistoryPacker
+from app.services.context_builder import ContextBuilder
+from app.services.inference_backend import load_cross_encoder
+from app.services.rerank_batcher import RerankBatcher
+from app.core.errors import QueryError, InvalidConversationIDError, DocumentNotFoundError, LLMOverloadedError, QueryTimeoutError, TooManyDocumentsError
+from app.core.metrics import ANSWER_CACHE_LOOKUPS, CONTEXT_TOKENS, LLM_REQUESTS, RERANK_BATCH_PAIRS, STAGE_SECONDS, record_llm_tokens, timed_stage
+from app.utils.helpers import estimate_tokens, hash_text
 
-conversation_histories: Dict[str, List[Dict[str, str]]] = {}
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError", "TooManyRequests",
+    "ConnectError", "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout", "RemoteProtocolError",
+}
+
+def _is_retryable_llm_error(error: BaseException) -> bool:
+    # Matched by status code and class name so this covers the Gemini SDKs and httpx without importing them.
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    try:
+        if int(code) in RETRYABLE_STATUS_CODES:
+            return True
+    except (TypeError, ValueError):
+        pass
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+class PreparedQuery:
+    def __init__(self, user_query: str, conversation_id: Optional[str], require_citations: bool, context_docs: List[Any], messages: List[Any], started_at: float):
+        self.user_query = user_query
+        self.conversation_id = conversation_id
+        self.require_citations = require_citations
+        self.context_docs = context_docs
+        self.messages = messages
+        self.started_at = started_at
+
+# Chunks sent in full for a single-document query when context packing is off.
+UNPACKED_TOP_N = 3
 
 class QAService:
-    def __init__(self, embedding_service: EmbeddingService):
+    def __init__(self, embedding_service: EmbeddingService, llm: Optional[BaseChatModel] = None, reranker: Optional[Any] = None):
         self.embedding_service = embedding_service
-        self.top_n_reranked = 3
+        self.top_n_reranked = UNPACKED_TOP_N
+        self.context_builder = None
+        if settings.CONTEXT_PACKING_ENABLED:
+            # The reranker hands over a wider pool and the builder decides how much of it is worth sending.
+            self.top_n_reranked = settings.CONTEXT_MAX_CHUNKS
+            self.context_builder = ContextBuilder(
+                token_budget=settings.CONTEXT_TOKEN_BUDGET,
+                score_gap=settings.RERANK_SCORE_GAP,
+                min_chunks=settings.CONTEXT_MIN_CHUNKS
+            )
         try:
-            self.llm = ChatGoogleGenerativeAI(
+            self.llm = llm or ChatGoogleGenerativeAI(
                 model=settings.LLM_MODEL_NAME,
                 google_api_key=settings.GOOGLE_API_KEY,
-                temperature=0.3
+                temperature=0.3,
+                # A single attempt per call: QAService retries with jittered backoff and per-request timeouts.
+                max_retries=1
             )
         except Exception as e:
             raise QueryError(f"Failed to initialize LLM: {str(e)}")
 
         try:
-            self.reranker = CrossEncoder(
-                model_name_or_path='BAAI/bge-reranker-base',
-                max_length=512,
-                device='cpu'
-            )
+            # Anything with a CrossEncoder-style predict(pairs) can stand in for the default model.
+            self.reranker = reranker or load_cross_encoder(settings.RERANKER_MODEL_NAME)
         except Exception as e:
-            print(f"Warning: Failed to load BAAI/bge-reranker-base. Reranking will be skipped. Error: {str(e)}")
+            print(f"Warning: Failed to load {settings.RERANKER_MODEL_NAME}. Reranking will be skipped. Error: {str(e)}")
             self.reranker = None
+
+        self.rerank_batcher = None
+        if self.reranker and settings.RERANK_BATCHING_ENABLED:
+            self.rerank_batcher = RerankBatcher(
+                reranker=self.reranker,
+                max_batch_pairs=settings.RERANK_MAX_BATCH_PAIRS,
+                max_wait_ms=settings.RERANK_MAX_WAIT_MS,
+                predict_batch_size=settings.RERANK_PREDICT_BATCH_SIZE
+            )
+        
+        self.conversation_store = create_conversation_store()
+        self.history_packer = HistoryPacker(
+            token_budget=settings.HISTORY_TOKEN_BUDGET,
+            summary_max_tokens=settings.HISTORY_SUMMARY_MAX_TOKENS
+        )
+
+        # Retrieval, reranking and store I/O run here so they never block the event loop.
+        self.cpu_pool = ThreadPoolExecutor(max_workers=settings.QUERY_CPU_WORKERS, thread_name_prefix="query-cpu")
+        # Bounds in-flight Gemini calls; they share the pooled async client of the single LLM instance.
+        self.llm_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+        self.answer_cache = None
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache(
+                max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+                similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+            )
+            self.embedding_service.add_document_listener(self.answer_cache.invalidate)
         
         self.rag_prompt_template = ChatPromptTemplate.from_messages([
             SystemMessage(
@@ -52,16 +135,64 @@ class QAService:
             ("human", "Retrieved Context:\n<context>\n{context}\n</context>\n\nUser Question: {question}")
         ])
 
-    def _format_docs(self, docs: List[Any]) -> str:
+    def warm_up(self):
+        if self.reranker:
+            self.reranker.predict([("warm up", "warm up")], show_progress_bar=False)
+        if settings.WARMUP_LLM:
+            self.llm.invoke("ping")
+
+    def close(self):
+        if self.rerank_batcher:
+            self.rerank_batcher.stop()
+        self.cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _rerank_scores(self, sentence_pairs: List[Tuple[str, str]]) -> List[float]:
+        if settings.METRICS_ENABLED:
+            RERANK_BATCH_PAIRS.observe(len(sentence_pairs))
+        with timed_stage("rerank", "predict"):
+            return self.reranker.predict(sentence_pairs, show_progress_bar=False)
+
+    def _record_llm_usage(self, mode: str, messages: List[Any], answer: str, usage: Optional[Dict[str, Any]]):
+        if not settings.METRICS_ENABLED:
+            return
+        LLM_REQUESTS.labels(mode, "success").inc()
+        if usage:
+            record_llm_tokens(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+        else:
+            record_llm_tokens(sum(estimate_tokens(str(message.content)) for message in messages), estimate_tokens(answer))
+
+    def rerank_stats(self) -> Dict[str, Any]:
+        if not self.rerank_batcher:
+            return {"enabled": False}
+        return self.rerank_batcher.stats()
+
+    def _format_docs(self, docs: List[Any], texts: Optional[List[str]] = None) -> str:
         if not docs:
             return "No relevant context found in the document for this question."
         
         formatted_docs = []
         for i, doc in enumerate(docs):
             metadata_str = f"(Source: {doc.metadata.get('document_name', 'N/A')}, Page: {doc.metadata.get('page_number', 'N/A')})"
-            formatted_docs.append(f"Context Snippet {i+1} {metadata_str}:\n{doc.page_content}")
+            text = texts[i] if texts else doc.page_content
+            formatted_docs.append(f"Context Snippet {i+1} {metadata_str}:\n{text}")
         return "\n\n".join(formatted_docs)
 
+    def _pack_context(self, scored_docs: List[Tuple[Optional[float], Any]], baseline_chunks: int) -> Tuple[List[Any], str]:
+        if not self.context_builder:
+            docs = [doc for _, doc in scored_docs]
+            return docs, self._format_docs(docs)
+
+        packed = self.context_builder.build(scored_docs, max_chunks=len(scored_docs), baseline_chunks=baseline_chunks)
+        if scored_docs:
+            logger.debug(
+                "Packed %d/%d chunks into ~%d context tokens; saved ~%d tokens vs. the top %d in full (%d trimmed as overlap).",
+                len(packed.docs), len(scored_docs), packed.packed_tokens, packed.saved_tokens, baseline_chunks, packed.overlap_tokens,
+            )
+        if settings.METRICS_ENABLED:
+            CONTEXT_TOKENS.labels("packed").inc(packed.packed_tokens)
+            CONTEXT_TOKENS.labels("saved").inc(packed.saved_tokens)
+        return packed.docs, self._format_docs(packed.docs, packed.snippets)
+
     def _extract_citations_from_answer_and_context(self, answer: str, context_docs: List[Any]) -> List[Dict[str, Any]]:
         citations = []
         used_docs_info = set()
@@ -69,26 +200,58 @@ class QAService:
         for doc in context_docs:
             doc_name = doc.metadata.get('document_name', 'Unknown Document')
             page_num = doc.metadata.get('page_number', 'N/A')
+            doc_id = doc.metadata.get('document_id')
             
-            citation_key = (doc_name, page_num)
+            citation_key = (doc_id, doc_name, page_num)
             if citation_key not in used_docs_info:
                 citations.append({
                     "page": page_num,
-                    "document_name": doc_name
+                    "document_name": doc_name,
+                    "document_id": doc_id
                 })
                 used_docs_info.add(citation_key)
         return citations
 
-    def query_document(self, user_query: str, document_id: str, conversation_id: str = None, require_citations: bool = True) -> Tuple[Dict[str, Any], str]:
+    def _retrieve_candidates(self, user_query: str, document_id: str, query_embedding: Optional[List[float]] = None) -> List[Any]:
         try:
-            retriever = self.embedding_service.get_retriever(document_id=document_id)
+            if query_embedding is None:
+                query_embedding = self.embedding_service.embed_query(user_query)
+            with timed_stage("qa", "retrieve"):
+                initial_docs = self.embedding_service.search_by_vector(
+                    document_id=document_id,
+                    query_embedding=query_embedding,
+                    k_results=settings.QUERY_PER_TARGET_K
+                )
         except DocumentNotFoundError:
             raise
         except Exception as e:
             raise QueryError(f"Failed to get document retriever for document ID {document_id}: {str(e)}")
+        return initial_docs
+
+    async def _arerank_candidates(self, user_query: str, initial_docs: List[Any], top_n: int) -> List[Tuple[Optional[float], Any]]:
+        if not self.rerank_batcher or not initial_docs:
+            # Unbatched predict() is CPU-bound, so it runs on the query pool.
+            return await self._run_blocking(self._rerank_candidates, user_query, initial_docs, top_n)
+        # Awaited on the event loop, so any number of queries can share a batch without parking pool threads.
+        logger.debug("Reranking %d documents for query: '%s...'", len(initial_docs), user_query[:50])
+        future = self.rerank_batcher.submit([(user_query, doc.page_content) for doc in initial_docs])
+        try:
+            with timed_stage("qa", "rerank"):
+                scores = await asyncio.wait_for(asyncio.wrap_future(future), timeout=settings.RERANK_TIMEOUT_SECONDS)
+        except Exception as e:
+            # A timeout cancels the batcher's future too, so the worker skips pairs nobody waits for.
+            logger.warning("Reranking failed. Falling back to initial retriever results limited to %d. Error: %r", top_n, e)
+            return [(None, doc) for doc in initial_docs[:top_n]]
+        return self._top_scored(scores, initial_docs, top_n)
+
+    def _top_scored(self, scores: List[float], docs: List[Any], top_n: int) -> List[Tuple[Optional[float], Any]]:
+        scored_docs = [(float(score), doc) for score, doc in zip(scores, docs)]
+        scored_docs.sort(key=lambda x: x[0], reverse=True)
+        return scored_docs[:top_n]
 
-        initial_docs = retriever.invoke(user_query)
-        context_docs = initial_docs
+    def _rerank_candidates(self, user_query: str, initial_docs: List[Any], top_n: int) -> List[Tuple[Optional[float], Any]]:
+        # Returns (score, doc) pairs best first; the score is None when reranking was skipped.
+        context_docs = [(None, doc) for doc in initial_docs]
 
         if self.reranker and initial_docs:
             try:
@@ -98,60 +261,339 @@ class QAService:
                 if not sentence_pairs:
                      print("No sentence pairs to rerank.")
                 else:
-                    scores = self.reranker.predict(sentence_pairs, show_progress_bar=False)
-                    scored_docs = list(zip(scores, initial_docs))
-                    scored_docs.sort(key=lambda x: x[0], reverse=True)
-                    context_docs = [doc for score, doc in scored_docs[:self.top_n_reranked]]
+                    with timed_stage("qa", "rerank"):
+                        scores = self._rerank_scores(sentence_pairs)
+                    context_docs = self._top_scored(scores, initial_docs, top_n)
                     print(f"Selected {len(context_docs)} documents after reranking.")
 
             except Exception as e:
-                print(f"Warning: Reranking failed. Falling back to initial retriever results limited to {self.top_n_reranked}. Error: {str(e)}")
-                context_docs = initial_docs[:self.top_n_reranked]
+                print(f"Warning: Reranking failed. Falling back to initial retriever results limited to {top_n}. Error: {str(e)}")
+                context_docs = [(None, doc) for doc in initial_docs[:top_n]]
         elif initial_docs: 
-            context_docs = initial_docs[:self.top_n_reranked] 
-
-        current_chat_history = []
-        if conversation_id:
-            if conversation_id not in conversation_histories:
-                raise InvalidConversationIDError()
-            history_tuples = conversation_histories.get(conversation_id, [])
-            for entry in history_tuples:
-                if entry["role"] == "user":
-                    current_chat_history.append(HumanMessage(content=entry["content"]))
-                elif entry["role"] == "assistant":
-                    current_chat_history.append(AIMessage(content=entry["content"]))
-        
-        formatted_context = self._format_docs(context_docs)
+            context_docs = context_docs[:top_n] 
+        return context_docs
+
+    def resolve_targets(self, document_id: Optional[str] = None, document_ids: Optional[List[str]] = None, collection: Optional[str] = None) -> List[str]:
+        if collection is not None:
+            targets = self.embedding_service.documents_in_collection(collection)
+            if not targets:
+                raise DocumentNotFoundError(f"Collection '{collection}' has no documents.")
+        elif document_ids is not None:
+            targets = list(dict.fromkeys(document_ids))
+        else:
+            targets = [document_id]
+        if len(targets) > settings.MULTI_DOC_MAX_TARGETS:
+            raise TooManyDocumentsError(f"A query can span at most {settings.MULTI_DOC_MAX_TARGETS} documents; got {len(targets)}.")
+        return targets
+
+    def _search_target(self, document_id: str, query_embedding: List[float]) -> Optional[List[Any]]:
+        try:
+            return self.embedding_service.search_by_vector(
+                document_id=document_id,
+                query_embedding=query_embedding,
+                k_results=settings.QUERY_PER_TARGET_K
+            )
+        except Exception as e:
+            print(f"Warning: Search failed for document {document_id} in multi-document query. Error: {str(e)}")
+            return None
+
+    def _check_missing(self, missing: List[str], target_count: int, skip_missing: bool):
+        # Documents named explicitly must all be searchable; a collection lookup may skip members that are not.
+        if not missing:
+            return
+        if not skip_missing:
+            raise DocumentNotFoundError(f"Documents not found or not searchable: {', '.join(missing)}. Ensure they are embedded.")
+        if len(missing) == target_count:
+            raise DocumentNotFoundError("None of the requested documents could be searched. Ensure they are embedded.")
+        logger.warning("Skipping %d of %d collection documents that are not searchable: %s", len(missing), target_count, ", ".join(missing))
+
+    async def _acheck_single_target(self, document_id: str, skip_missing: bool):
+        # The single-document path searches with a filter, which finds nothing for an unknown id rather than failing.
+        try:
+            exists = await self._run_blocking(self.embedding_service.document_exists, document_id)
+        except Exception as e:
+            logger.warning("Could not check whether document %s exists. Error: %r", document_id, e)
+            exists = False
+        self._check_missing([] if exists else [document_id], 1, skip_missing)
+
+    def _merge_candidates(self, results: List[List[Any]]) -> List[Any]:
+        # Interleaved by rank so every document gets its best chunks in before the candidate limit cuts in.
+        merged, seen = [], set()
+        for rank in range(max((len(docs) for docs in results), default=0)):
+            for docs in results:
+                if rank >= len(docs):
+                    continue
+                doc = docs[rank]
+                chunk_hash = doc.metadata.get("chunk_hash") or hash_text(doc.page_content)
+                if chunk_hash in seen:
+                    continue
+                seen.add(chunk_hash)
+                merged.append(doc)
+                if len(merged) >= settings.MULTI_DOC_MAX_CANDIDATES:
+                    return merged
+        return merged
+
+    def _load_chat_history(self, conversation_id: Optional[str]) -> List[Any]:
+        if not conversation_id:
+            return []
+        history = self.conversation_store.get_messages(conversation_id)
+        if history is None:
+            raise InvalidConversationIDError()
+        return self.history_packer.pack(history)
+
+    def _record_turn(self, conversation_id: Optional[str], user_query: str, answer: str) -> str:
+        new_conv_id = conversation_id
+        if not new_conv_id:
+            new_conv_id = f"conv_{os.urandom(8).hex()}" 
         
-        messages = self.rag_prompt_template.format_messages(
-            context=formatted_context,
-            question=user_query,
-            chat_history=current_chat_history
+        self.conversation_store.append_messages(new_conv_id, [
+            {"role": "user", "content": user_query},
+            {"role": "assistant", "content": answer}
+        ])
+        return new_conv_id
+
+    def _build_prepared_query(self, user_query: str, conversation_id: Optional[str], require_citations: bool, scored_docs: List[Tuple[Optional[float], Any]], chat_history: List[Any], started_at: float, baseline_chunks: int) -> PreparedQuery:
+        with timed_stage("qa", "prompt"):
+            # Citations come from the packed chunks only, so they match what the model actually saw.
+            context_docs, context = self._pack_context(scored_docs, baseline_chunks)
+            messages = self.rag_prompt_template.format_messages(
+                context=context,
+                question=user_query,
+                chat_history=chat_history
+            )
+        return PreparedQuery(
+            user_query=user_query,
+            conversation_id=conversation_id,
+            require_citations=require_citations,
+            context_docs=context_docs,
+            messages=messages,
+            started_at=started_at
         )
-        
+
+    def _citations_for(self, prepared: PreparedQuery, answer: str) -> List[Dict[str, Any]]:
+        if prepared.require_citations and prepared.context_docs:
+            return self._extract_citations_from_answer_and_context(answer, prepared.context_docs)
+        return []
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        # Copy the context so per-request timings recorded on the pool thread still reach Server-Timing.
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.cpu_pool, functools.partial(context.run, func, *args, **kwargs))
+
+    async def aprepare_query(self, user_query: str, document_id: str, conversation_id: str = None, require_citations: bool = True, query_embedding: Optional[List[float]] = None) -> PreparedQuery:
+        started_at = time.perf_counter()
+        with timed_stage("qa", "history"):
+            chat_history = await self._run_blocking(self._load_chat_history, conversation_id)
+        initial_docs = await self._run_blocking(self._retrieve_candidates, user_query, document_id, query_embedding)
+        scored_docs = await self._arerank_candidates(user_query, initial_docs, self.top_n_reranked)
+        return self._build_prepared_query(user_query, conversation_id, require_citations, scored_docs, chat_history, started_at, UNPACKED_TOP_N)
+
+    async def aprepare_multi_query(self, user_query: str, document_ids: List[str], conversation_id: str = None, require_citations: bool = True, skip_missing: bool = False) -> PreparedQuery:
+        if len(document_ids) == 1:
+            await self._acheck_single_target(document_ids[0], skip_missing)
+            return await self.aprepare_query(user_query, document_ids[0], conversation_id, require_citations)
+
+        started_at = time.perf_counter()
+        with timed_stage("qa", "history"):
+            chat_history = await self._run_blocking(self._load_chat_history, conversation_id)
+        query_embedding = await self._run_blocking(self.embedding_service.embed_query, user_query)
+        with timed_stage("qa", "retrieve"):
+            results = await asyncio.gather(*(self._run_blocking(self._search_target, document_id, query_embedding) for document_id in document_ids))
+        missing = [document_id for document_id, docs in zip(document_ids, results) if not docs]
+        self._check_missing(missing, len(document_ids), skip_missing)
+        found = [docs for docs in results if docs]
+
+        # One rerank over the merged pool, so scores are comparable across documents.
+        candidates = self._merge_candidates(found)
+        scored_docs = await self._arerank_candidates(user_query, candidates, settings.MULTI_DOC_TOP_N)
+        return self._build_prepared_query(user_query, conversation_id, require_citations, scored_docs, chat_history, started_at, settings.MULTI_DOC_TOP_N)
+
+    async def _acquire_llm_slot(self, mode: str = "invoke"):
         try:
-            llm_response = self.llm.invoke(messages)
+            await asyncio.wait_for(self.llm_slots.acquire(), timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            if settings.METRICS_ENABLED:
+                LLM_REQUESTS.labels(mode, "rejected").inc()
+            raise LLMOverloadedError()
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Full jitter keeps clients that failed together from retrying together.
+        return random.uniform(0, min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+    async def _ainvoke_llm(self, messages: List[Any]) -> Any:
+        attempt = 0
+        while True:
+            await self._acquire_llm_slot()
+            try:
+                with timed_stage("qa", "llm"):
+                    return await asyncio.wait_for(self.llm.ainvoke(messages), timeout=settings.LLM_TIMEOUT_SECONDS)
+            except Exception as e:
+                if attempt >= settings.LLM_MAX_RETRIES or not _is_retryable_llm_error(e):
+                    raise
+                error = e
+            finally:
+                # The slot is not held while backing off, so retries do not starve fresh requests.
+                self.llm_slots.release()
+            delay = self._retry_delay(attempt)
+            logger.warning("LLM call failed (attempt %d); retrying in %.2fs. Error: %r", attempt + 1, delay, error)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _agenerate_answer(self, prepared: PreparedQuery) -> Dict[str, Any]:
+        try:
+            llm_response = await self._ainvoke_llm(prepared.messages)
             answer = llm_response.content if hasattr(llm_response, 'content') else str(llm_response)
+        except LLMOverloadedError:
+            raise
         except Exception as e:
+            if settings.METRICS_ENABLED:
+                LLM_REQUESTS.labels("invoke", "error").inc()
+            if isinstance(e, asyncio.TimeoutError):
+                raise QueryTimeoutError("The language model did not respond in time.")
             raise QueryError(f"Error during LLM invocation: {str(e)}")
+        self._record_llm_usage("invoke", prepared.messages, answer, getattr(llm_response, "usage_metadata", None))
 
-        citations_list = []
-        if require_citations and context_docs:
-            citations_list = self._extract_citations_from_answer_and_context(answer, context_docs)
-
-        response_data = {
+        return {
             "answer": answer,
-            "citations": citations_list
+            "citations": self._citations_for(prepared, answer)
         }
 
-        new_conv_id = conversation_id
-        if not new_conv_id:
-            new_conv_id = f"conv_{os.urandom(4).hex()}" 
-        
-        if new_conv_id not in conversation_histories:
-            conversation_histories[new_conv_id] = []
-        
-        conversation_histories[new_conv_id].append({"role": "user", "content": user_query})
-        conversation_histories[new_conv_id].append({"role": "assistant", "content": answer})
+    async def _acached_answer(self, user_query: str, document_id: str) -> Dict[str, Any]:
+        normalized = normalize_query(user_query)
+        query_embedding = await self._run_blocking(self.embedding_service.embed_query, user_query)
+        with timed_stage("qa", "answer_cache_lookup"):
+            # Read from the shared catalog, so a document another worker changed is not answered from cache.
+            generation = await self._run_blocking(self.embedding_service.document_generation, document_id)
+            response_data = self.answer_cache.lookup(document_id, normalized, query_embedding, generation)
+        if response_data is not None:
+            if settings.METRICS_ENABLED:
+                ANSWER_CACHE_LOOKUPS.labels("hit").inc()
+            return response_data
+
+        future, is_leader = self.answer_cache.begin(document_id, normalized, generation)
+        if settings.METRICS_ENABLED:
+            ANSWER_CACHE_LOOKUPS.labels("miss" if is_leader else "coalesced").inc()
+        if not is_leader:
+            # Shielded so a follower that times out does not cancel the shared future for everyone else.
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            # Cached answers always carry citations; callers that do not want them drop them afterwards.
+            prepared = await self.aprepare_query(user_query, document_id, require_citations=True, query_embedding=query_embedding)
+            response_data = await self._agenerate_answer(prepared)
+        except asyncio.CancelledError:
+            self.answer_cache.fail(document_id, normalized, QueryError("The request computing this answer was cancelled."))
+            raise
+        except Exception as e:
+            self.answer_cache.fail(document_id, normalized, e)
+            raise
+        self.answer_cache.store(document_id, normalized, query_embedding, response_data, generation)
+        return response_data
+
+    async def _aquery_document(self, user_query: str, document_id: str, conversation_id: Optional[str], require_citations: bool) -> Tuple[Dict[str, Any], str]:
+        # History changes the answer, so conversation-bound queries never use the answer cache.
+        if self.answer_cache and not conversation_id:
+            response_data = await self._acached_answer(user_query, document_id)
+            if not require_citations:
+                response_data = {**response_data, "citations": []}
+        else:
+            prepared = await self.aprepare_query(user_query, document_id, conversation_id, require_citations)
+            response_data = await self._agenerate_answer(prepared)
+
+        new_conv_id = await self._run_blocking(self._record_turn, conversation_id, user_query, response_data["answer"])
+        return response_data, new_conv_id
+
+    async def _aquery_documents(self, user_query: str, document_ids: List[str], conversation_id: Optional[str], require_citations: bool, skip_missing: bool) -> Tuple[Dict[str, Any], str]:
+        if len(document_ids) == 1:
+            await self._acheck_single_target(document_ids[0], skip_missing)
+            return await self._aquery_document(user_query, document_ids[0], conversation_id, require_citations)
+        # The answer cache is keyed by a single document, so multi-document answers are always generated.
+        prepared = await self.aprepare_multi_query(user_query, document_ids, conversation_id, require_citations, skip_missing)
+        response_data = await self._agenerate_answer(prepared)
+        new_conv_id = await self._run_blocking(self._record_turn, conversation_id, user_query, response_data["answer"])
+        return response_data, new_conv_id
 
-        return response_data, new_conv_id
\ No newline at end of file
+    async def _with_query_timeout(self, coro):
+        try:
+            return await asyncio.wait_for(coro, timeout=settings.QUERY_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise QueryTimeoutError(f"The query did not complete within {settings.QUERY_TIMEOUT_SECONDS:g} seconds.")
+
+    async def aquery_document(self, user_query: str, document_id: str, conversation_id: str = None, require_citations: bool = True) -> Tuple[Dict[str, Any], str]:
+        return await self._with_query_timeout(self._aquery_document(user_query, document_id, conversation_id, require_citations))
+
+    async def aquery_documents(self, user_query: str, document_ids: List[str], conversation_id: str = None, require_citations: bool = True, skip_missing: bool = False) -> Tuple[Dict[str, Any], str]:
+        return await self._with_query_timeout(self._aquery_documents(user_query, document_ids, conversation_id, require_citations, skip_missing))
+
+    def answer_cache_stats(self) -> Dict[str, Any]:
+        if not self.answer_cache:
+            return {"enabled": False}
+        return self.answer_cache.stats()
+
+    async def astream_answer(self, prepared: PreparedQuery) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        answer_parts = []
+        time_to_first_token = None
+        usage = None
+        llm_started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                await self._acquire_llm_slot("stream")
+            except LLMOverloadedError as e:
+                yield "error", {"message": e.detail}
+                return
+            stream = None
+            try:
+                stream = self.llm.astream(prepared.messages).__aiter__()
+                while True:
+                    try:
+                        # The timeout bounds the gap between chunks, not the whole answer.
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout=settings.LLM_TIMEOUT_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    if getattr(chunk, "usage_metadata", None):
+                        # Chunks carry usage deltas, so the stream total is their sum.
+                        usage = add_usage(usage, chunk.usage_metadata)
+                    text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                    if not text:
+                        continue
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - prepared.started_at
+                        if settings.METRICS_ENABLED:
+                            STAGE_SECONDS.labels("qa", "llm_first_token").observe(time.perf_counter() - llm_started)
+                    answer_parts.append(text)
+                    yield "token", {"text": text}
+                break
+            except Exception as e:
+                # Once tokens have been sent the answer cannot be restarted, so only retry before the first one.
+                if answer_parts or attempt >= settings.LLM_MAX_RETRIES or not _is_retryable_llm_error(e):
+                    if settings.METRICS_ENABLED:
+                        LLM_REQUESTS.labels("stream", "error").inc()
+                    message = "The language model did not respond in time." if isinstance(e, asyncio.TimeoutError) else f"Error during LLM invocation: {str(e)}"
+                    yield "error", {"message": message}
+                    return
+                error = e
+            finally:
+                try:
+                    if stream is not None:
+                        await stream.aclose()
+                finally:
+                    # The slot is not held while backing off, so retries do not starve fresh requests.
+                    self.llm_slots.release()
+            delay = self._retry_delay(attempt)
+            logger.warning("LLM stream failed (attempt %d); retrying in %.2fs. Error: %r", attempt + 1, delay, error)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        answer = "".join(answer_parts)
+        if settings.METRICS_ENABLED:
+            STAGE_SECONDS.labels("qa", "llm_stream").observe(time.perf_counter() - llm_started)
+        self._record_llm_usage("stream", prepared.messages, answer, usage)
+        new_conv_id = await self._run_blocking(self._record_turn, prepared.conversation_id, prepared.user_query, answer)
+        total = time.perf_counter() - prepared.started_at
+        yield "done", {
+            "citations": self._citations_for(prepared, answer),
+            "conversation_id": new_conv_id,
+            "time_to_first_token_ms": round(time_to_first_token * 1000, 1) if time_to_first_token is not None else None,
+            "total_ms": round(total * 1000, 1)
+        }
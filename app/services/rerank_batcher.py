@@ -0,0 +1,160 @@
+import bisect
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.core.metrics import RERANK_BATCH_PAIRS, timed_stage
+
+class BucketHistogram:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{bound:g}" for bound in self.bounds] + ["le_inf"]
+            cumulative, buckets = 0, {}
+            for label, count in zip(labels, self.counts):
+                cumulative += count
+                buckets[label] = cumulative
+            return {
+                "count": self.count,
+                "sum": round(self.total, 6),
+                "mean": round(self.total / self.count, 6) if self.count else 0.0,
+                "buckets": buckets,
+            }
+
+
+class RerankRequest:
+    def __init__(self, pairs: List[Tuple[str, str]]):
+        self.pairs = pairs
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class RerankBatcher:
+    # How long stop() waits for an in-flight predict before failing the requests still queued.
+    STOP_JOIN_SECONDS = 5
+
+    def __init__(self, reranker: Any, max_batch_pairs: int, max_wait_ms: float, predict_batch_size: int):
+        self.reranker = reranker
+        self.max_batch_pairs = max_batch_pairs
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.predict_batch_size = predict_batch_size
+        self.batch_size_histogram = BucketHistogram([1, 5, 10, 20, 40, 64, 128, 256])
+        self.queue_wait_histogram = BucketHistogram([0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1])
+        self._queue: "queue.Queue[Optional[RerankRequest]]" = queue.Queue()
+        self._stopped = False
+        self._stop_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._worker, name="rerank-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, pairs: List[Tuple[str, str]]) -> Future:
+        request = RerankRequest(pairs)
+        # Checked and enqueued under the lock so nothing lands behind the stop sentinel unnoticed.
+        with self._stop_lock:
+            if self._stopped:
+                raise RuntimeError("Rerank batcher is stopped.")
+            self._queue.put(request)
+        return request.future
+
+    def score(self, pairs: List[Tuple[str, str]], timeout: Optional[float] = None) -> List[float]:
+        timeout = settings.RERANK_TIMEOUT_SECONDS if timeout is None else timeout
+        future = self.submit(pairs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Cancelling keeps the worker from scoring pairs nobody is waiting for any more.
+            future.cancel()
+            raise TimeoutError(f"Reranking did not finish within {timeout:g} seconds.")
+
+    def stop(self):
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(None)
+        self._thread.join(timeout=self.STOP_JOIN_SECONDS)
+        # Whatever the worker did not get to would otherwise leave its callers blocked forever.
+        sentinel_drained = False
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                sentinel_drained = True
+            elif request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("Rerank batcher stopped before scoring this request."))
+        if sentinel_drained:
+            # The worker is still busy; it must still find the sentinel when it comes back for more.
+            self._queue.put(None)
+
+    def _worker(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, pair_count = [first], len(first.pairs)
+            # The oldest request bounds how long the batch may keep collecting.
+            deadline = first.enqueued_at + self.max_wait_seconds
+            while pair_count < self.max_batch_pairs:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+                pair_count += len(request.pairs)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[RerankRequest]):
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.monotonic()
+        for request in batch:
+            self.queue_wait_histogram.observe(started - request.enqueued_at)
+        pairs = [pair for request in batch for pair in request.pairs]
+        self.batch_size_histogram.observe(len(pairs))
+        if settings.METRICS_ENABLED:
+            RERANK_BATCH_PAIRS.observe(len(pairs))
+
+        try:
+            with timed_stage("rerank", "predict"):
+                scores = self.reranker.predict(pairs, batch_size=self.predict_batch_size, show_progress_bar=False)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in batch:
+            request.future.set_result([float(score) for score in scores[offset:offset + len(request.pairs)]])
+            offset += len(request.pairs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "max_batch_pairs": self.max_batch_pairs,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "batch_size_pairs": self.batch_size_histogram.snapshot(),
+            "queue_wait_seconds": self.queue_wait_histogram.snapshot(),
+        }
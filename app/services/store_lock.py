@@ -0,0 +1,46 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class StoreLock:
+    # Readers/writer lock shared by every process using the same Chroma directory (e.g. uvicorn workers).
+    # Each acquisition opens its own descriptor: flock() locks belong to the open file, so threads of one
+    # process would otherwise share (and silently upgrade) a single lock.
+    def __init__(self, path: str):
+        self.path = path
+        self._fallback = threading.RLock()
+        if fcntl is None:
+            print("Warning: fcntl is unavailable; the Chroma store lock only covers this process.")
+
+    @contextmanager
+    def _flock(self, mode: int) -> Iterator[None]:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, mode)
+            yield
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        if fcntl is None:
+            with self._fallback:
+                yield
+            return
+        with self._flock(fcntl.LOCK_SH):
+            yield
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        if fcntl is None:
+            with self._fallback:
+                yield
+            return
+        with self._flock(fcntl.LOCK_EX):
+            yield
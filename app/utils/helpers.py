@@ -1,4 +1,74 @@
+import hashlib
+import json
+import os
 import uuid
+import zipfile
+from typing import Any, Dict, Iterable, List, Tuple
+
+CHARS_PER_TOKEN = 4
 
 def generate_unique_id() -> str:
-    return str(uuid.uuid4())
\ No newline at end of file
+    return str(uuid.uuid4())
+
+def estimate_tokens(text: str) -> int:
+    # Gemini's tokenizer is not available locally; ~4 characters per token is close enough for budgeting.
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def compute_file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def is_archive(file_path: str) -> bool:
+    return file_path.lower().endswith(".zip") and zipfile.is_zipfile(file_path)
+
+def extract_archive_members(archive_path: str, target_dir: str, allowed_extensions: Iterable[str], max_total_bytes: int) -> List[Tuple[str, str]]:
+    allowed = {ext.lower() for ext in allowed_extensions}
+    extracted = []
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not os.path.basename(info.filename).startswith(".")
+            and "__MACOSX" not in info.filename
+            and os.path.splitext(info.filename)[1].lower() in allowed
+        ]
+        if sum(info.file_size for info in members) > max_total_bytes:
+            raise ValueError(f"Archive expands beyond the {max_total_bytes} byte limit.")
+
+        for index, info in enumerate(members):
+            # Member names are never used as paths, which rules out zip-slip traversal.
+            file_path = os.path.join(target_dir, f"{index}_{os.path.basename(info.filename)}")
+            with archive.open(info) as source, open(file_path, "wb") as target:
+                while True:
+                    block = source.read(1024 * 1024)
+                    if not block:
+                        break
+                    target.write(block)
+            extracted.append((file_path, info.filename))
+    return extracted
+
+def format_sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,60 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+def _metrics(report: Dict[str, Any]) -> List[Tuple[str, Tuple[str, ...], bool]]:
+    # (label, path into the results, whether a higher value is better)
+    metrics = [
+        ("ingestion chunks/s", ("ingestion", "chunks_per_second"), True),
+        ("peak RSS MiB", ("peak_rss_mb", "self"), False),
+        ("worker peak RSS MiB", ("peak_rss_mb", "children"), False),
+    ]
+    for level in sorted(report.get("query", {}), key=int):
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            metrics.append((f"query c={level} {key}", ("query", level, key), False))
+        metrics.append((f"query c={level} req/s", ("query", level, "requests_per_second"), True))
+    return metrics
+
+def _lookup(report: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    value: Any = report
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold_percent: float) -> bool:
+    print(f"baseline:  {baseline.get('git_commit')} {baseline.get('label', '')} ({baseline.get('created_at')})")
+    print(f"candidate: {candidate.get('git_commit')} {candidate.get('label', '')} ({candidate.get('created_at')})")
+    print(f"{'metric':<28}{'baseline':>12}{'candidate':>12}{'change':>10}")
+
+    regressed = False
+    for label, path, higher_is_better in _metrics(baseline):
+        before, after = _lookup(baseline, path), _lookup(candidate, path)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        worse = change < -threshold_percent if higher_is_better else change > threshold_percent
+        regressed = regressed or worse
+        marker = "  REGRESSION" if worse else ""
+        print(f"{label:<28}{before:>12}{after:>12}{change:>+9.1f}%{marker}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression.")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if compare(baseline, candidate, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
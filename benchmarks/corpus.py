@@ -0,0 +1,129 @@
+import os
+import random
+from dataclasses import dataclass, field
+from typing import List, Tuple
+import docx
+
+SUBJECTS = [
+    "the reactor", "the audit committee", "the pipeline", "the warehouse", "the vaccine trial",
+    "the satellite", "the quarterly budget", "the migration plan", "the supplier", "the data center",
+    "the research team", "the pilot program", "the compliance review", "the turbine", "the archive",
+]
+VERBS = [
+    "reported", "exceeded", "reduced", "delayed", "approved", "measured", "replaced", "monitored",
+    "documented", "scheduled", "rejected", "calibrated", "expanded", "summarised", "tracked",
+]
+OBJECTS = [
+    "coolant pressure", "operating costs", "latency targets", "inventory levels", "patient outcomes",
+    "orbital drift", "staffing forecasts", "database schemas", "delivery windows", "power usage",
+    "sample sizes", "training budgets", "risk ratings", "blade vibration", "retention policies",
+]
+QUALIFIERS = [
+    "during the third quarter", "after the spring inspection", "across all regional sites",
+    "ahead of the board meeting", "within the agreed tolerance", "for the second year running",
+    "despite the supply shortages", "under the revised guidelines", "before the final deadline",
+]
+PDF_LINE_CHARS = 90
+
+@dataclass
+class CorpusFile:
+    path: str
+    format: str
+    pages: int
+    facts: List[str] = field(default_factory=list)
+
+
+def _sentence(rng: random.Random) -> str:
+    return f"{rng.choice(SUBJECTS).capitalize()} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(QUALIFIERS)}."
+
+def _page_paragraphs(rng: random.Random, paragraphs_per_page: int) -> List[str]:
+    return [" ".join(_sentence(rng) for _ in range(rng.randint(4, 8))) for _ in range(paragraphs_per_page)]
+
+def _wrap(text: str, width: int) -> List[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_text_pdf(path: str, pages: List[List[str]]):
+    # Minimal PDF with a real text layer, so the fast path parses it the way it parses exported reports.
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for paragraphs in pages:
+        lines = []
+        for paragraph in paragraphs:
+            lines.extend(_wrap(paragraph, PDF_LINE_CHARS))
+            lines.append("")
+        stream = "BT /F1 10 Tf 12 TL 50 790 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        content = stream.encode("latin-1", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref)
+        page_refs.append(len(objects))
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_refs)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    with open(path, "wb") as f:
+        f.write(output)
+
+def _write_docx(path: str, pages: List[List[str]]):
+    document = docx.Document()
+    for page_number, paragraphs in enumerate(pages):
+        if page_number:
+            document.add_page_break()
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+    document.save(path)
+
+def _write_txt(path: str, pages: List[List[str]]):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraph for paragraphs in pages for paragraph in paragraphs))
+
+WRITERS = {"txt": _write_txt, "docx": _write_docx, "pdf": write_text_pdf}
+
+def generate_corpus(output_dir: str, formats: List[str], docs_per_format: int, pages_per_doc: int, paragraphs_per_page: int = 6, seed: int = 13) -> List[CorpusFile]:
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    files = []
+    for file_format in formats:
+        if file_format not in WRITERS:
+            raise ValueError(f"Unsupported corpus format: {file_format}")
+        for index in range(docs_per_format):
+            pages = [_page_paragraphs(rng, paragraphs_per_page) for _ in range(pages_per_doc)]
+            path = os.path.join(output_dir, f"synthetic_{index:03d}.{file_format}")
+            WRITERS[file_format](path, pages)
+            facts = [rng.choice(paragraphs).split(". ")[0] for paragraphs in pages]
+            files.append(CorpusFile(path=path, format=file_format, pages=pages_per_doc, facts=facts))
+    return files
+
+def synthetic_passages(count: int, seed: int = 13) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(_sentence(rng) for _ in range(rng.randint(3, 6))) for _ in range(count)]
+
+def make_queries(files: List[CorpusFile], count: int, seed: int = 13) -> List[Tuple[CorpusFile, str]]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        corpus_file = rng.choice(files)
+        words = rng.choice(corpus_file.facts).rstrip(".").split()
+        queries.append((corpus_file, f"What does the document say about how {' '.join(words[:2]).lower()} {' '.join(words[2:5])}?"))
+    return queries
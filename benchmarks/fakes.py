@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+# Offline stand-in for ChatGoogleGenerativeAI: sleeps like a remote call and answers from the prompt.
+class FakeGeminiChat(BaseChatModel):
+    first_token_latency_ms: float = 200.0
+    tokens_per_second: float = 80.0
+    answer_tokens: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _answer_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = messages[-1].content if messages else ""
+        words = tokenize(prompt if isinstance(prompt, str) else str(prompt)) or ["no", "context"]
+        tokens = [words[i % len(words)] + " " for i in range(self.answer_tokens)]
+        source = re.search(r"\(Source: [^)]*\)", prompt) if isinstance(prompt, str) else None
+        if source:
+            tokens.append(source.group(0))
+        return tokens
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _total_delay(self) -> float:
+        return self.first_token_latency_ms / 1000 + self.answer_tokens * self._token_delay()
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._total_delay())
+        message = AIMessage(content="".join(self._answer_tokens(messages)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._total_delay())
+        message = AIMessage(content="".join(self._answer_tokens(messages)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency_ms / 1000)
+        for token in self._answer_tokens(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            time.sleep(self._token_delay())
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency_ms / 1000)
+        for token in self._answer_tokens(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            await asyncio.sleep(self._token_delay())
+
+
+# Deterministic bag-of-words embedding, cheap enough that the benchmark measures the service rather than the model.
+class HashingEmbeddings(Embeddings):
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value & (1 << 63) else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+# CrossEncoder-compatible scorer: the fraction of query tokens found in the passage.
+class LexicalReranker:
+    def predict(self, sentence_pairs: Sequence[Tuple[str, str]], batch_size: int = 32, show_progress_bar: bool = False, **kwargs: Any) -> np.ndarray:
+        scores = []
+        for query, passage in sentence_pairs:
+            query_tokens = set(tokenize(query))
+            passage_tokens = set(tokenize(passage))
+            scores.append(len(query_tokens & passage_tokens) / len(query_tokens) if query_tokens else 0.0)
+        return np.asarray(scores, dtype=np.float32)
@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+import numpy as np
+from benchmarks.corpus import synthetic_passages
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare the ONNX inference backend against PyTorch before switching INFERENCE_BACKEND.")
+    parser.add_argument("--embedding-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--reranker-model", default="BAAI/bge-reranker-base")
+    parser.add_argument("--quantization", default="avx512_vnni", help="none, arm64, avx2, avx512 or avx512_vnni.")
+    parser.add_argument("--num-threads", type=int, default=0, help="ONNX Runtime intra-op threads; 0 keeps the runtime default.")
+    parser.add_argument("--passages", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5, help="Retrieval depth, matching QAService.")
+    parser.add_argument("--top-n", type=int, default=3, help="Chunks kept after reranking, matching QAService.")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Minimum mean recall@k of ONNX retrieval against PyTorch.")
+    parser.add_argument("--min-rerank-overlap", type=float, default=0.95, help="Minimum mean overlap of the reranked top-n sets.")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", default=None, help="Optional path for a JSON report.")
+    return parser.parse_args()
+
+def _queries(passages: List[str], count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        sentence = rng.choice(rng.choice(passages).split(". "))
+        words = sentence.rstrip(".").split()
+        queries.append(f"Which report says {' '.join(words[:2]).lower()} {' '.join(words[2:5])}?")
+    return queries
+
+def _kendall_tau(first: List[float], second: List[float]) -> float:
+    concordant = discordant = 0
+    for i in range(len(first)):
+        for j in range(i + 1, len(first)):
+            sign = (first[i] - first[j]) * (second[i] - second[j])
+            if sign > 0:
+                concordant += 1
+            elif sign < 0:
+                discordant += 1
+    pairs = concordant + discordant
+    return (concordant - discordant) / pairs if pairs else 1.0
+
+def _embed(model_name: str, backend: str, quantization: str, passages: List[str], queries: List[str]) -> Dict[str, Any]:
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from app.services.inference_backend import embedding_model_source
+
+    started = time.perf_counter()
+    source, model_kwargs = embedding_model_source(model_name, backend, quantization)
+    model = HuggingFaceEmbeddings(model_name=source, model_kwargs=model_kwargs, encode_kwargs={"normalize_embeddings": True})
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    passage_vectors = np.asarray(model.embed_documents(passages), dtype=np.float32)
+    encode_seconds = time.perf_counter() - started
+    query_vectors = np.asarray([model.embed_query(query) for query in queries], dtype=np.float32)
+    return {"passages": passage_vectors, "queries": query_vectors, "load_seconds": load_seconds, "encode_seconds": encode_seconds}
+
+def _rerank(model_name: str, backend: str, quantization: str, pairs: List[List[Any]]) -> Dict[str, Any]:
+    from app.services.inference_backend import load_cross_encoder
+
+    started = time.perf_counter()
+    reranker = load_cross_encoder(model_name, backend, quantization)
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scores = [[float(score) for score in reranker.predict(query_pairs, show_progress_bar=False)] for query_pairs in pairs]
+    return {"scores": scores, "load_seconds": load_seconds, "predict_seconds": time.perf_counter() - started}
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    passages = synthetic_passages(args.passages, args.seed)
+    queries = _queries(passages, args.queries, args.seed)
+
+    torch_embeddings = _embed(args.embedding_model, "torch", "none", passages, queries)
+    onnx_embeddings = _embed(args.embedding_model, "onnx", args.quantization, passages, queries)
+
+    vector_cosines = np.sum(torch_embeddings["passages"] * onnx_embeddings["passages"], axis=1)
+    torch_top = np.argsort(-(torch_embeddings["queries"] @ torch_embeddings["passages"].T), axis=1)[:, :args.k]
+    onnx_top = np.argsort(-(onnx_embeddings["queries"] @ onnx_embeddings["passages"].T), axis=1)[:, :args.k]
+    recalls = [len(set(expected) & set(actual)) / args.k for expected, actual in zip(torch_top, onnx_top)]
+
+    # Both rerankers score the same PyTorch candidates so ordering differences come from the reranker alone.
+    pairs = [[[query, passages[i]] for i in candidates] for query, candidates in zip(queries, torch_top)]
+    torch_rerank = _rerank(args.reranker_model, "torch", "none", pairs)
+    onnx_rerank = _rerank(args.reranker_model, "onnx", args.quantization, pairs)
+
+    overlaps, top1_matches, taus = [], [], []
+    for expected, actual in zip(torch_rerank["scores"], onnx_rerank["scores"]):
+        expected_top = set(np.argsort(expected)[::-1][:args.top_n])
+        actual_top = set(np.argsort(actual)[::-1][:args.top_n])
+        overlaps.append(len(expected_top & actual_top) / args.top_n)
+        top1_matches.append(float(np.argmax(expected) == np.argmax(actual)))
+        taus.append(_kendall_tau(expected, actual))
+
+    return {
+        "config": vars(args),
+        "embedding": {
+            "mean_vector_cosine": round(float(vector_cosines.mean()), 5),
+            "min_vector_cosine": round(float(vector_cosines.min()), 5),
+            f"recall_at_{args.k}": round(float(np.mean(recalls)), 4),
+            "torch_encode_seconds": round(torch_embeddings["encode_seconds"], 3),
+            "onnx_encode_seconds": round(onnx_embeddings["encode_seconds"], 3),
+            "torch_load_seconds": round(torch_embeddings["load_seconds"], 3),
+            "onnx_load_seconds": round(onnx_embeddings["load_seconds"], 3),
+        },
+        "rerank": {
+            f"top_{args.top_n}_overlap": round(float(np.mean(overlaps)), 4),
+            "top_1_agreement": round(float(np.mean(top1_matches)), 4),
+            "mean_kendall_tau": round(float(np.mean(taus)), 4),
+            "torch_predict_seconds": round(torch_rerank["predict_seconds"], 3),
+            "onnx_predict_seconds": round(onnx_rerank["predict_seconds"], 3),
+            "torch_load_seconds": round(torch_rerank["load_seconds"], 3),
+            "onnx_load_seconds": round(onnx_rerank["load_seconds"], 3),
+        },
+    }
+
+def main():
+    args = parse_args()
+    # Settings are read at import time, so the thread count has to be in the environment before app/ is imported.
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ["ONNX_NUM_THREADS"] = str(args.num_threads)
+    report = run(args)
+    print(json.dumps({"embedding": report["embedding"], "rerank": report["rerank"]}, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    recall = report["embedding"][f"recall_at_{args.k}"]
+    overlap = report["rerank"][f"top_{args.top_n}_overlap"]
+    if recall < args.min_recall or overlap < args.min_rerank_overlap:
+        print(f"FAIL: recall@{args.k} {recall} (min {args.min_recall}), rerank top-{args.top_n} overlap {overlap} (min {args.min_rerank_overlap})")
+        sys.exit(1)
+    print("PASS: ONNX backend matches PyTorch within the configured thresholds.")
+
+
+if __name__ == "__main__":
+    main()
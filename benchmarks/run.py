@@ -0,0 +1,245 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from benchmarks.corpus import CorpusFile, generate_corpus, make_queries
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+CONTENT_TYPES = {
+    "txt": "text/plain",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+}
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline ingestion and query benchmark for the RAG API.")
+    parser.add_argument("--formats", default="txt,docx,pdf", help="Comma-separated corpus formats.")
+    parser.add_argument("--docs-per-format", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=10, help="Pages per synthetic document.")
+    parser.add_argument("--paragraphs-per-page", type=int, default=6)
+    parser.add_argument("--ingest-concurrency", type=int, default=1)
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated query concurrency levels.")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per concurrency level.")
+    parser.add_argument("--warmup-queries", type=int, default=5)
+    parser.add_argument("--llm-first-token-ms", type=float, default=200.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--llm-answer-tokens", type=int, default=40)
+    parser.add_argument("--embedding-model", default="hashing", help="'hashing' for the built-in stand-in, or a locally cached sentence-transformers model name.")
+    parser.add_argument("--reranker-model", default="lexical", help="'lexical' for the built-in stand-in, or a locally cached cross-encoder model name.")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the answer cache on; it is off by default so repeated queries measure the full pipeline.")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--label", default="", help="Free-form label stored with the results.")
+    parser.add_argument("--output", default=None, help="Results path; defaults to benchmarks/results/<timestamp>_<commit>.json.")
+    return parser.parse_args()
+
+def _configure_environment(args: argparse.Namespace, work_dir: str):
+    # Settings are read at import time, so this has to run before anything under app/ is imported.
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ.setdefault("LLM_MODEL_NAME", "fake-gemini")
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    os.environ["CHROMA_PERSIST_DIRECTORY"] = os.path.join(work_dir, "chroma")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(work_dir, "embedding_cache.sqlite3")
+    os.environ["CONVERSATION_STORE_BACKEND"] = "memory"
+    os.environ["ANSWER_CACHE_ENABLED"] = "true" if args.answer_cache else "false"
+    os.environ["WARMUP_LLM"] = "false"
+    os.environ["EMBEDDING_MODEL_NAME"] = "offline-hashing" if args.embedding_model == "hashing" else args.embedding_model
+    if args.reranker_model != "lexical":
+        os.environ["RERANKER_MODEL_NAME"] = args.reranker_model
+
+def _git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": False}
+    return {"commit": commit, "dirty": dirty}
+
+def _peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+def _latency_summary(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, Any]:
+    summary = {"requests": len(latencies) + errors, "errors": errors, "wall_seconds": round(wall_seconds, 3)}
+    if latencies:
+        values = np.asarray(latencies) * 1000
+        summary.update({
+            "p50_ms": round(float(np.percentile(values, 50)), 1),
+            "p95_ms": round(float(np.percentile(values, 95)), 1),
+            "p99_ms": round(float(np.percentile(values, 99)), 1),
+            "mean_ms": round(float(values.mean()), 1),
+            "requests_per_second": round(len(latencies) / wall_seconds, 2) if wall_seconds > 0 else None,
+        })
+    return summary
+
+async def _ingest(client, embedding_service, files: List[CorpusFile], concurrency: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    document_ids: Dict[str, str] = {}
+    per_format: Dict[str, Dict[str, Any]] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def upload(corpus_file: CorpusFile):
+        async with semaphore:
+            started = time.perf_counter()
+            with open(corpus_file.path, "rb") as f:
+                files_payload = {"file": (os.path.basename(corpus_file.path), f.read(), CONTENT_TYPES[corpus_file.format])}
+            response = await client.post("/api/embedding", files=files_payload)
+            elapsed = time.perf_counter() - started
+            body = response.json()
+            if response.status_code != 200 or "document_id" not in body:
+                raise RuntimeError(f"Embedding {corpus_file.path} failed ({response.status_code}): {body}")
+            document_ids[corpus_file.path] = body["document_id"]
+            stats = per_format.setdefault(corpus_file.format, {"files": 0, "chunks": 0, "seconds": 0.0})
+            stats["files"] += 1
+            stats["seconds"] += elapsed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(upload(corpus_file) for corpus_file in files))
+    wall_seconds = time.perf_counter() - started
+
+    # Counted after the clock stops so the store reads do not inflate ingestion time.
+    for corpus_file in files:
+        per_format[corpus_file.format]["chunks"] += embedding_service.count_chunks(document_ids[corpus_file.path])
+    total_chunks = sum(stats["chunks"] for stats in per_format.values())
+    for stats in per_format.values():
+        stats["mean_ms_per_file"] = round(stats["seconds"] / stats["files"] * 1000, 1)
+        stats["seconds"] = round(stats["seconds"], 3)
+    return document_ids, {
+        "files": len(files),
+        "chunks": total_chunks,
+        "wall_seconds": round(wall_seconds, 3),
+        "chunks_per_second": round(total_chunks / wall_seconds, 2) if wall_seconds > 0 else None,
+        "per_format": per_format,
+    }
+
+async def _run_queries(client, queries: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    pending = asyncio.Queue()
+    for payload in queries:
+        pending.put_nowait(payload)
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                payload = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            response = await client.post("/api/query", json=payload)
+            if response.status_code == 200 and response.json().get("status") == "success":
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _latency_summary(latencies, errors, time.perf_counter() - started)
+
+async def run_benchmark(args: argparse.Namespace, work_dir: str) -> Dict[str, Any]:
+    import httpx
+    from fastapi.concurrency import run_in_threadpool
+    from app.main import app
+    from app.services.model_registry import model_registry
+    from app.services.ingestion_jobs import ingestion_jobs
+    from benchmarks.fakes import FakeGeminiChat, HashingEmbeddings, LexicalReranker
+
+    files = generate_corpus(
+        output_dir=os.path.join(work_dir, "corpus"),
+        formats=[f.strip() for f in args.formats.split(",") if f.strip()],
+        docs_per_format=args.docs_per_format,
+        pages_per_doc=args.pages,
+        paragraphs_per_page=args.paragraphs_per_page,
+        seed=args.seed
+    )
+
+    llm = FakeGeminiChat(
+        first_token_latency_ms=args.llm_first_token_ms,
+        tokens_per_second=args.llm_tokens_per_second,
+        answer_tokens=args.llm_answer_tokens
+    )
+    started = time.perf_counter()
+    # ASGITransport does not run the lifespan hook, so the benchmark loads the registry itself.
+    await run_in_threadpool(
+        model_registry.load,
+        embedding_model=HashingEmbeddings() if args.embedding_model == "hashing" else None,
+        llm=llm,
+        reranker=LexicalReranker() if args.reranker_model == "lexical" else None
+    )
+    if not model_registry.ready:
+        raise RuntimeError(f"Model registry failed to load: {model_registry.load_error}")
+    startup_seconds = time.perf_counter() - started
+    ingestion_jobs.start()
+
+    results: Dict[str, Any] = {"startup_seconds": round(startup_seconds, 3)}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            print(f"Ingesting {len(files)} documents...")
+            document_ids, results["ingestion"] = await _ingest(client, model_registry.embedding_service, files, args.ingest_concurrency)
+            print(f"  {results['ingestion']['chunks']} chunks at {results['ingestion']['chunks_per_second']} chunks/s")
+
+            def payloads(count: int, seed: int) -> List[Dict[str, Any]]:
+                return [
+                    {"query": query, "document_id": document_ids[corpus_file.path], "require_citations": True}
+                    for corpus_file, query in make_queries(files, count, seed)
+                ]
+
+            await _run_queries(client, payloads(args.warmup_queries, args.seed - 1), 1)
+            results["query"] = {}
+            for level in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+                summary = await _run_queries(client, payloads(args.queries, args.seed + level), level)
+                results["query"][str(level)] = summary
+                print(f"  concurrency {level}: p50 {summary.get('p50_ms')} ms, p95 {summary.get('p95_ms')} ms, p99 {summary.get('p99_ms')} ms, errors {summary['errors']}")
+    finally:
+        # Parse workers only count towards RUSAGE_CHILDREN once they have been reaped.
+        ingestion_jobs.shutdown(wait=True)
+        model_registry.shutdown()
+
+    results["peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="rag-benchmark-") as work_dir:
+        _configure_environment(args, work_dir)
+        results = asyncio.run(run_benchmark(args, work_dir))
+
+    revision = _git_revision()
+    report = {
+        "label": args.label,
+        "git_commit": revision["commit"],
+        "git_dirty": revision["dirty"],
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        **results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{revision['commit']}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Peak RSS: {results['peak_rss_mb']['self']} MiB (workers {results['peak_rss_mb']['children']} MiB)")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
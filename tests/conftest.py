@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# Settings are read when app.core.config is imported, so the environment has to be ready before any test module imports app/.
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("CHROMA_PERSIST_DIRECTORY", tempfile.mkdtemp(prefix="rag-tests-"))
@@ -0,0 +1,104 @@
+import time
+import numpy as np
+import pytest
+from app.services.answer_cache import AnswerCache, normalize_query
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+def _response(answer):
+    return {"answer": answer, "citations": [{"page": 1, "document_name": "a.pdf"}]}
+
+@pytest.fixture
+def cache():
+    return AnswerCache(max_entries=10, ttl_seconds=60, similarity_threshold=0.9)
+
+def test_normalize_query_ignores_case_whitespace_and_trailing_punctuation():
+    assert normalize_query("  What is   the Revenue?? ") == "what is the revenue"
+
+def test_exact_hit_returns_a_copy(cache):
+    cache.store("doc", "q", _unit(1, 0), _response("first"), 0)
+    hit = cache.lookup("doc", "q", _unit(0, 1), 0)
+    assert hit == _response("first")
+    hit["answer"] = "mutated"
+    assert cache.lookup("doc", "q", _unit(0, 1), 0)["answer"] == "first"
+    assert cache.stats()["exact_hits"] == 2
+
+def test_semantic_hit_above_threshold_only(cache):
+    cache.store("doc", "revenue in 2023", _unit(1, 0), _response("20%"), 0)
+    assert cache.lookup("doc", "2023 revenue", _unit(1, 0.1), 0)["answer"] == "20%"
+    assert cache.lookup("doc", "unrelated", _unit(0, 1), 0) is None
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 1)
+
+def test_entries_are_scoped_to_their_document(cache):
+    cache.store("doc", "q", _unit(1, 0), _response("a"), 0)
+    assert cache.lookup("other", "q", _unit(1, 0), 0) is None
+
+def test_expired_entries_miss():
+    cache = AnswerCache(max_entries=10, ttl_seconds=0.01, similarity_threshold=0.9)
+    cache.store("doc", "q", _unit(1, 0), _response("a"), 0)
+    time.sleep(0.02)
+    assert cache.lookup("doc", "q", _unit(1, 0), 0) is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(max_entries=2, ttl_seconds=60, similarity_threshold=0.99)
+    cache.store("doc", "a", _unit(1, 0, 0), _response("a"), 0)
+    cache.store("doc", "b", _unit(0, 1, 0), _response("b"), 0)
+    cache.lookup("doc", "a", _unit(1, 0, 0), 0)
+    cache.store("doc", "c", _unit(0, 0, 1), _response("c"), 0)
+    assert cache.lookup("doc", "b", _unit(0, 1, 0), 0) is None
+    assert cache.lookup("doc", "a", _unit(1, 0, 0), 0)["answer"] == "a"
+    assert cache.stats()["entries"] == 2
+
+def test_concurrent_misses_coalesce_on_the_leader(cache):
+    future, is_leader = cache.begin("doc", "q", 0)
+    follower, follower_is_leader = cache.begin("doc", "q", 0)
+    assert is_leader and not follower_is_leader
+    assert follower is future
+    cache.store("doc", "q", _unit(1, 0), _response("shared"), 0)
+    assert follower.result(timeout=1)["answer"] == "shared"
+    assert cache.stats()["coalesced"] == 1
+
+def test_begin_after_store_reuses_the_stored_answer(cache):
+    # A caller that missed in lookup() but reaches begin() after the leader stored must not lead again.
+    cache.lookup("doc", "q", _unit(1, 0), 0)
+    future, _ = cache.begin("doc", "q", 0)
+    cache.store("doc", "q", _unit(1, 0), _response("stored"), 0)
+    late, is_leader = cache.begin("doc", "q", 0)
+    assert not is_leader
+    assert late.result(timeout=0)["answer"] == "stored"
+
+def test_failure_propagates_to_followers_and_allows_a_new_leader(cache):
+    cache.begin("doc", "q", 0)
+    follower, _ = cache.begin("doc", "q", 0)
+    cache.fail("doc", "q", RuntimeError("llm down"))
+    with pytest.raises(RuntimeError):
+        follower.result(timeout=1)
+    _, is_leader = cache.begin("doc", "q", 0)
+    assert is_leader
+
+def test_invalidate_drops_entries_of_that_document_only(cache):
+    cache.store("doc", "q", _unit(1, 0), _response("a"), 0)
+    cache.store("other", "q", _unit(1, 0), _response("b"), 0)
+    cache.invalidate("doc")
+    assert cache.lookup("doc", "q", _unit(1, 0), 0) is None
+    assert cache.lookup("other", "q", _unit(1, 0), 0)["answer"] == "b"
+
+def test_answer_computed_before_a_document_change_is_not_served(cache):
+    # The document moves to generation 1 (in any process) while the leader is still answering at generation 0.
+    future, _ = cache.begin("doc", "q", 0)
+    cache.store("doc", "q", _unit(1, 0), _response("stale"), 0)
+    assert future.result(timeout=1)["answer"] == "stale"
+    assert cache.lookup("doc", "q", _unit(1, 0), 1) is None
+    assert cache.stats()["entries"] == 0
+
+def test_document_changed_by_another_process_drops_its_entries_only(cache):
+    cache.store("doc", "q", _unit(1, 0), _response("a"), 3)
+    cache.store("other", "q", _unit(1, 0), _response("b"), 0)
+    assert cache.lookup("doc", "q", _unit(1, 0), 3)["answer"] == "a"
+    assert cache.lookup("doc", "q", _unit(1, 0), 4) is None
+    _, is_leader = cache.begin("doc", "q", 4)
+    assert is_leader
+    assert cache.lookup("other", "q", _unit(1, 0), 0)["answer"] == "b"
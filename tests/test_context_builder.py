@@ -0,0 +1,71 @@
+import pytest
+from langchain_core.documents import Document
+from app.services.context_builder import ContextBuilder
+
+PAGE = "Revenue grew by twenty percent in 2023, driven by exports. Margins held steady while costs rose."
+
+def _doc(text, parser="pdf_text", start_index=None, page_number=1):
+    metadata = {"document_id": "doc", "page_number": page_number, "parser": parser}
+    if start_index is not None:
+        metadata["start_index"] = start_index
+    return Document(page_content=text, metadata=metadata)
+
+def _scored(*scores, length=40):
+    # Each chunk is 40 characters, i.e. 10 estimated tokens.
+    return [(score, _doc(chr(ord("a") + i) * length, page_number=i + 1)) for i, score in enumerate(scores)]
+
+def _builder(token_budget=1000, score_gap=0.25, min_chunks=1):
+    return ContextBuilder(token_budget=token_budget, score_gap=score_gap, min_chunks=min_chunks)
+
+def test_sharp_score_drop_ends_the_context():
+    packed = _builder().build(_scored(0.9, 0.8, 0.2, 0.1), max_chunks=4, baseline_chunks=3)
+    assert len(packed.docs) == 2
+
+def test_unscored_chunks_are_not_cut_by_the_gap():
+    packed = _builder().build(_scored(None, None, None), max_chunks=3, baseline_chunks=3)
+    assert len(packed.docs) == 3
+
+def test_token_budget_ends_the_context():
+    packed = _builder(token_budget=25).build(_scored(0.9, 0.9, 0.9), max_chunks=3, baseline_chunks=3)
+    assert len(packed.docs) == 2
+    assert packed.packed_tokens == 20
+
+def test_max_chunks_limits_the_candidates():
+    packed = _builder().build(_scored(0.9, 0.9, 0.9), max_chunks=2, baseline_chunks=3)
+    assert len(packed.docs) == 2
+
+@pytest.mark.parametrize("builder", [_builder(token_budget=5, min_chunks=2), _builder(score_gap=0.1, min_chunks=2)])
+def test_min_chunks_are_kept_despite_budget_and_gap(builder):
+    packed = builder.build(_scored(0.9, 0.5, 0.1), max_chunks=3, baseline_chunks=3)
+    assert len(packed.docs) == 2
+
+def test_overlapping_chunk_from_the_same_page_is_trimmed():
+    first, second = _doc(PAGE[:60], start_index=0), _doc(PAGE[40:], start_index=40)
+    packed = _builder().build([(0.9, first), (0.8, second)], max_chunks=2, baseline_chunks=3)
+    assert packed.snippets == [PAGE[:60], "... " + PAGE[60:].strip()]
+    assert packed.overlap_tokens > 0
+
+def test_fully_covered_chunk_is_dropped():
+    first, second = _doc(PAGE, start_index=0), _doc(PAGE[10:50], start_index=10)
+    packed = _builder().build([(0.9, first), (0.8, second)], max_chunks=2, baseline_chunks=3)
+    assert packed.docs == [first]
+
+def test_chunks_whose_text_differs_are_not_trimmed():
+    first, second = _doc(PAGE[:60], start_index=0), _doc("x" * 20 + PAGE[60:], start_index=40)
+    packed = _builder().build([(0.9, first), (0.8, second)], max_chunks=2, baseline_chunks=3)
+    assert packed.snippets[1] == second.page_content
+
+def test_unstructured_chunks_are_never_trimmed():
+    # Unstructured start_index values are relative to an element, not the page, so they cannot be compared.
+    first, second = _doc(PAGE[:60], parser="unstructured", start_index=0), _doc(PAGE[40:], parser="unstructured", start_index=40)
+    packed = _builder().build([(0.9, first), (0.8, second)], max_chunks=2, baseline_chunks=3)
+    assert packed.snippets == [first.page_content, second.page_content]
+
+def test_savings_are_measured_against_the_unpacked_top_chunks():
+    packed = _builder(token_budget=20).build(_scored(0.9, 0.9, 0.9, 0.9, 0.9), max_chunks=5, baseline_chunks=3)
+    assert (packed.baseline_tokens, packed.packed_tokens, packed.saved_tokens) == (30, 20, 10)
+
+def test_packing_more_than_the_baseline_reports_no_savings():
+    packed = _builder().build(_scored(0.9, 0.9, 0.9, 0.9, 0.9), max_chunks=5, baseline_chunks=3)
+    assert packed.packed_tokens == 50
+    assert packed.saved_tokens == 0
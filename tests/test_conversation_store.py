@@ -0,0 +1,70 @@
+import os
+import time
+import pytest
+from app.services.conversation_store import ConversationStore, InMemoryConversationStore, SQLiteConversationStore
+
+def _turn(i):
+    return [{"role": "user", "content": f"question {i}"}, {"role": "assistant", "content": f"answer {i}"}]
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(max_conversations=10, ttl_seconds=60, max_messages=100):
+        if request.param == "memory":
+            return InMemoryConversationStore(max_conversations, ttl_seconds, max_messages)
+        store = SQLiteConversationStore(os.path.join(tmp_path, "conversations.sqlite3"), max_conversations, ttl_seconds, max_messages)
+        # Purge on every write so eviction is observable without 100 appends.
+        store.PURGE_EVERY_WRITES = 1
+        return store
+    return make
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        ConversationStore(1, 1, 1)
+
+def test_unknown_conversation_returns_none(make_store):
+    assert make_store().get_messages("missing") is None
+
+def test_messages_round_trip_in_order(make_store):
+    store = make_store()
+    store.append_messages("c", _turn(1))
+    store.append_messages("c", _turn(2))
+    assert store.get_messages("c") == _turn(1) + _turn(2)
+
+def test_history_is_truncated_to_the_most_recent_messages(make_store):
+    store = make_store(max_messages=3)
+    for i in range(3):
+        store.append_messages("c", _turn(i))
+    assert store.get_messages("c") == _turn(1)[1:] + _turn(2)
+
+def test_idle_conversations_expire(make_store):
+    store = make_store(ttl_seconds=0.05)
+    store.append_messages("c", _turn(1))
+    time.sleep(0.1)
+    assert store.get_messages("c") is None
+
+def test_least_recently_updated_conversation_is_evicted(make_store):
+    store = make_store(max_conversations=2)
+    for conversation_id in ("a", "b", "c"):
+        store.append_messages(conversation_id, _turn(1))
+        time.sleep(0.01)
+    assert store.get_messages("a") is None
+    assert store.get_messages("b") == _turn(1)
+    assert store.get_messages("c") == _turn(1)
+
+def test_recently_updated_conversation_survives_eviction(make_store):
+    store = make_store(max_conversations=2)
+    store.append_messages("a", _turn(1))
+    time.sleep(0.01)
+    store.append_messages("b", _turn(1))
+    time.sleep(0.01)
+    store.append_messages("a", _turn(2))
+    time.sleep(0.01)
+    store.append_messages("c", _turn(1))
+    assert store.get_messages("b") is None
+    assert store.get_messages("a") == _turn(1) + _turn(2)
+
+@pytest.mark.parametrize("limits", [(0, 60, 10), (10, 60, 0), (10, 0, 10)])
+def test_non_positive_limits_are_rejected(make_store, limits):
+    max_conversations, ttl_seconds, max_messages = limits
+    with pytest.raises(ValueError):
+        make_store(max_conversations=max_conversations, ttl_seconds=ttl_seconds, max_messages=max_messages)
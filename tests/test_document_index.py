@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from app.services.document_index import DocumentIndex, DocumentIndexCache
+
+def _index(document_id, texts):
+    embeddings = np.eye(len(texts), 4, dtype=np.float32)
+    return DocumentIndex(document_id, embeddings, list(texts), [{"document_id": document_id, "page_number": i + 1} for i in range(len(texts))])
+
+class Store:
+    def __init__(self):
+        self.texts = {"doc": ["alpha", "beta", "gamma"]}
+        self.generations = {}
+        self.loads = 0
+
+    def load(self, document_id):
+        self.loads += 1
+        texts = self.texts.get(document_id)
+        return _index(document_id, texts) if texts else None
+
+    def generation(self, document_id):
+        return self.generations.get(document_id, 0)
+
+@pytest.fixture
+def store():
+    return Store()
+
+@pytest.fixture
+def cache(store):
+    cache = DocumentIndexCache(loader=store.load, max_bytes=1 << 20, generation_of=store.generation)
+    yield cache
+    cache.close()
+
+def _settle(cache):
+    # The loader runs on a single thread, so an empty task queued behind it finishes after every pending load.
+    cache._executor.submit(lambda: None).result(timeout=5)
+
+def _texts(docs):
+    return [doc.page_content for doc in docs]
+
+def test_search_ranks_by_cosine_similarity():
+    index = _index("doc", ["alpha", "beta", "gamma"])
+    assert _texts(index.search([0.1, 0.9, 0.5, 0.0], 2)) == ["beta", "gamma"]
+    assert index.search([1, 0, 0, 0], 0) == []
+
+def test_miss_loads_in_the_background_then_hits(cache, store):
+    assert cache.search("doc", [1, 0, 0, 0], 1) is None
+    _settle(cache)
+    assert _texts(cache.search("doc", [1, 0, 0, 0], 1)) == ["alpha"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["documents"], store.loads) == (1, 1, 1, 1)
+
+def test_concurrent_misses_load_once(cache, store):
+    cache.search("doc", [1, 0, 0, 0], 1)
+    cache.search("doc", [1, 0, 0, 0], 1)
+    _settle(cache)
+    assert store.loads == 1
+
+def test_unknown_document_is_not_cached(cache):
+    assert cache.search("missing", [1, 0, 0, 0], 1) is None
+    _settle(cache)
+    assert cache.search("missing", [1, 0, 0, 0], 1) is None
+    assert cache.stats()["documents"] == 0
+
+def test_invalidate_drops_the_index(cache):
+    cache.search("doc", [1, 0, 0, 0], 1)
+    _settle(cache)
+    cache.invalidate("doc")
+    assert cache.stats()["bytes"] == 0
+    assert cache.search("doc", [1, 0, 0, 0], 1) is None
+
+def test_newer_generation_reloads_the_index(cache, store):
+    cache.search("doc", [1, 0, 0, 0], 1)
+    _settle(cache)
+    store.texts["doc"] = ["delta", "epsilon"]
+    store.generations["doc"] = 1
+    assert cache.search("doc", [1, 0, 0, 0], 1) is None
+    _settle(cache)
+    assert _texts(cache.search("doc", [1, 0, 0, 0], 1)) == ["delta"]
+
+def test_load_that_raced_a_change_is_not_served(store):
+    # The document changes while its old chunks are being loaded; the index keeps the generation read before loading.
+    def load_then_change(document_id):
+        index = store.load(document_id)
+        store.texts["doc"] = ["delta"]
+        store.generations["doc"] = 1
+        return index
+
+    cache = DocumentIndexCache(loader=load_then_change, max_bytes=1 << 20, generation_of=store.generation)
+    try:
+        cache.search("doc", [1, 0, 0, 0], 1)
+        _settle(cache)
+        assert cache.search("doc", [1, 0, 0, 0], 1) is None
+    finally:
+        cache.close()
+
+def test_least_recently_used_index_is_evicted(store):
+    store.texts["other"] = ["x", "y", "z"]
+    size = _index("doc", store.texts["doc"]).nbytes
+    cache = DocumentIndexCache(loader=store.load, max_bytes=size + size // 2, generation_of=store.generation)
+    try:
+        for document_id in ("doc", "other"):
+            cache.search(document_id, [1, 0, 0, 0], 1)
+            _settle(cache)
+        assert cache.search("doc", [1, 0, 0, 0], 1) is None
+        assert cache.search("other", [1, 0, 0, 0], 1) is not None
+    finally:
+        cache.close()
@@ -0,0 +1,50 @@
+import docx
+from docx.enum.text import WD_BREAK
+from docx.oxml import OxmlElement
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import write_text_pdf
+
+def _rendered_break(paragraph):
+    # Word writes this where it last laid out a new page; python-docx has no API for it.
+    paragraph.add_run()._r.append(OxmlElement("w:lastRenderedPageBreak"))
+
+def _pages_by_text(file_path):
+    chunks = DocumentProcessor().process_document(file_path=str(file_path), document_name="report.docx")
+    return {chunk.page_content: chunk.metadata["page_number"] for chunk in chunks}
+
+def test_docx_manual_break_followed_by_rendered_break_counts_once(tmp_path):
+    document = docx.Document()
+    document.add_paragraph("Opening summary.")
+    document.add_paragraph().add_run("Closing line of page one.").add_break(WD_BREAK.PAGE)
+    second = document.add_paragraph()
+    _rendered_break(second)
+    second.add_run("Start of page two.")
+    third = document.add_paragraph()
+    _rendered_break(third)
+    third.add_run("Start of page three.")
+    file_path = tmp_path / "report.docx"
+    document.save(file_path)
+
+    pages = _pages_by_text(file_path)
+    assert pages["Opening summary.\n\nClosing line of page one."] == 1
+    assert pages["Start of page two."] == 2
+    assert pages["Start of page three."] == 3
+
+def test_docx_text_after_a_break_in_the_same_paragraph_moves_to_the_next_page(tmp_path):
+    document = docx.Document()
+    run = document.add_paragraph().add_run("Before the break.")
+    run.add_break(WD_BREAK.PAGE)
+    run.add_text("After the break.")
+    file_path = tmp_path / "report.docx"
+    document.save(file_path)
+
+    assert _pages_by_text(file_path) == {"Before the break.": 1, "After the break.": 2}
+
+def test_pdf_page_ranges_match_the_whole_file_parse(tmp_path):
+    file_path = str(tmp_path / "report.pdf")
+    write_text_pdf(file_path, [[f"Paragraph {page}.{line} about the quarterly figures." for line in range(3)] for page in range(1, 6)])
+    processor = DocumentProcessor()
+    whole = processor.process_document(file_path=file_path, document_name="report.pdf")
+    ranges = processor.process_page_range(file_path, "report.pdf", 1, 2) + processor.process_page_range(file_path, "report.pdf", 3, 5)
+    assert [(chunk.page_content, chunk.metadata) for chunk in ranges] == [(chunk.page_content, chunk.metadata) for chunk in whole]
+    assert sorted({chunk.metadata["page_number"] for chunk in ranges}) == [1, 2, 3, 4, 5]
@@ -0,0 +1,87 @@
+import uuid
+import pytest
+from chromadb.api.models.Collection import Collection
+from langchain_core.documents import Document
+from app.core.errors import EmbeddingError
+from app.services.embedding_service import EmbeddingService
+from benchmarks.fakes import HashingEmbeddings
+
+@pytest.fixture(scope="module")
+def service():
+    return EmbeddingService(embedding_model=HashingEmbeddings())
+
+def _chunks(*texts):
+    return [Document(page_content=text, metadata={"document_name": "report.txt", "page_number": 1}) for text in texts]
+
+def _stored_texts(service, document_id):
+    return sorted(service._get_stored_chunks(document_id, include=["documents"])["documents"])
+
+def _embedded(service, texts):
+    document_id = str(uuid.uuid4())
+    service.embed_and_store_chunks(document_id, _chunks(*texts))
+    return document_id
+
+def test_update_reuses_unchanged_chunks_and_embeds_only_new_ones(service):
+    document_id = _embedded(service, ["alpha", "beta", "gamma", "delta"])
+    counts = service.update_document(document_id, "report-v2.txt", iter(_chunks("alpha", "gamma", "epsilon")))
+    assert counts == {"chunks_reused": 2, "chunks_embedded": 1, "chunks_deleted": 2}
+    assert _stored_texts(service, document_id) == ["alpha", "epsilon", "gamma"]
+    assert service.count_chunks(document_id) == 3
+
+def test_update_with_identical_content_changes_nothing(service):
+    document_id = _embedded(service, ["alpha", "beta"])
+    counts = service.update_document(document_id, "report.txt", _chunks("alpha", "beta"))
+    assert counts == {"chunks_reused": 2, "chunks_embedded": 0, "chunks_deleted": 0}
+
+def test_failed_delete_leaves_the_old_version(service, monkeypatch):
+    document_id = _embedded(service, ["alpha", "beta"])
+    original_delete = Collection.delete
+    calls = []
+
+    def failing_delete(self, *args, **kwargs):
+        calls.append(kwargs.get("ids"))
+        if len(calls) == 1:
+            raise RuntimeError("disk full")
+        return original_delete(self, *args, **kwargs)
+
+    monkeypatch.setattr(Collection, "delete", failing_delete)
+    with pytest.raises(EmbeddingError):
+        service.update_document(document_id, "report.txt", _chunks("alpha", "zeta"))
+    assert _stored_texts(service, document_id) == ["alpha", "beta"]
+
+def test_failed_delete_restores_refreshed_metadata(service, monkeypatch):
+    document_id = _embedded(service, ["alpha", "beta"])
+    before = service._get_stored_chunks(document_id, include=["metadatas"])
+    original_delete = Collection.delete
+    calls = []
+
+    def failing_delete(self, *args, **kwargs):
+        calls.append(kwargs.get("ids"))
+        if len(calls) == 1:
+            raise RuntimeError("disk full")
+        return original_delete(self, *args, **kwargs)
+
+    # "alpha" is reused but moves to page 2 and gains a key, so its metadata is refreshed before the delete fails.
+    moved = Document(page_content="alpha", metadata={"document_name": "report.txt", "page_number": 2, "section": "intro"})
+    monkeypatch.setattr(Collection, "delete", failing_delete)
+    with pytest.raises(EmbeddingError):
+        service.update_document(document_id, "report.txt", [moved] + _chunks("zeta"))
+    after = service._get_stored_chunks(document_id, include=["metadatas"])
+    assert dict(zip(after["ids"], after["metadatas"])) == dict(zip(before["ids"], before["metadatas"]))
+
+def test_index_cached_by_another_process_is_not_served_after_an_update(service):
+    # A second service on the same store stands in for another worker process with its own in-memory index.
+    other = EmbeddingService(embedding_model=HashingEmbeddings())
+    try:
+        document_id = _embedded(service, ["alpha", "beta"])
+        query = other.embed_query("alpha")
+        other.search_by_vector(document_id, query, 5)
+        other.index_cache._executor.submit(lambda: None).result(timeout=5)
+        assert {doc.page_content for doc in other.search_by_vector(document_id, query, 5)} == {"alpha", "beta"}
+        assert other.index_cache.stats()["hits"] == 1
+
+        service.update_document(document_id, "report.txt", _chunks("alpha", "gamma"))
+        assert {doc.page_content for doc in other.search_by_vector(document_id, query, 5)} == {"alpha", "gamma"}
+        assert other.index_cache.stats()["hits"] == 1
+    finally:
+        other.close()
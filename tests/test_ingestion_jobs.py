@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from app.core.config import settings
+from app.core.errors import IngestionQueueFullError, IngestionQueueOverflowError
+from app.services.document_processor import DocumentProcessor
+from app.services.ingestion_jobs import IngestionJob, IngestionJobManager
+from benchmarks.corpus import write_text_pdf
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_MAX_QUEUE_SIZE", 4)
+    return IngestionJobManager()
+
+def test_full_queue_is_rejected(manager):
+    manager._pending = 4
+    with pytest.raises(IngestionQueueFullError):
+        manager.ensure_capacity()
+
+def test_request_larger_than_the_free_slots_reports_the_overflow(manager):
+    manager._pending = 1
+    manager.ensure_capacity(3)
+    with pytest.raises(IngestionQueueOverflowError) as error:
+        manager.ensure_capacity(5)
+    assert error.value.status_code == 429
+    assert "2 over" in error.value.detail
+
+def test_rejected_bulk_request_is_not_counted_as_pending(manager):
+    uploads = [(f"/tmp/{i}.txt", f"{i}.txt") for i in range(5)]
+    with pytest.raises(IngestionQueueOverflowError):
+        asyncio.run(manager.ingest_bulk(uploads, embedding_service=None))
+    assert manager._pending == 0
+
+def test_streamed_page_ranges_match_the_whole_file_parse(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "report.pdf")
+    write_text_pdf(file_path, [[f"Paragraph {page}.{line} about the quarterly figures." for line in range(3)] for page in range(1, 8)])
+    monkeypatch.setattr(settings, "INGESTION_WORKERS", 1)
+    monkeypatch.setattr(settings, "STREAMING_PAGES_PER_TASK", 2)
+    monkeypatch.setattr(settings, "STREAMING_MAX_IN_FLIGHT_RANGES", 3)
+    manager = IngestionJobManager()
+    pages_parsed = []
+
+    async def stream():
+        loop = asyncio.get_running_loop()
+        manager.start()
+        try:
+            chunks = manager.iter_pdf_chunks(file_path, "report.pdf", 7, loop, on_pages_parsed=pages_parsed.append)
+            streamed = await loop.run_in_executor(None, list, chunks)
+            # Every range gave its parse slot back.
+            assert manager._parse_slots._value == 1
+            return streamed
+        finally:
+            manager.shutdown(wait=True)
+
+    streamed = asyncio.run(stream())
+    whole = DocumentProcessor().process_document(file_path=file_path, document_name="report.pdf")
+    assert [(chunk.page_content, chunk.metadata) for chunk in streamed] == [(chunk.page_content, chunk.metadata) for chunk in whole]
+    assert pages_parsed == [2, 4, 6, 7]
+
+def test_streamed_job_reports_embedding_once_every_page_is_parsed():
+    job = IngestionJob(document_name="report.pdf", file_path="/tmp/report.pdf", temp_dir="/tmp")
+    job.pages_total = 4
+    job.set_status("parsing")
+    job.record_pages_parsed(2)
+    assert job.status == "parsing"
+    job.record_pages_parsed(4)
+    assert job.status == "embedding"
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from langchain_core.documents import Document
+from app.core.errors import DocumentNotFoundError
+from app.services.embedding_service import EmbeddingService
+from app.services.qa_service import QAService, _is_retryable_llm_error
+from benchmarks.fakes import FakeGeminiChat, HashingEmbeddings, LexicalReranker
+
+class StatusError(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+class ResourceExhausted(Exception):
+    pass
+
+class FlakyLLM:
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return "ok"
+
+@pytest.fixture(scope="module")
+def embedding_service():
+    return EmbeddingService(embedding_model=HashingEmbeddings())
+
+@pytest.fixture
+def service(embedding_service):
+    qa_service = QAService(embedding_service, llm=FakeGeminiChat(first_token_latency_ms=0, answer_tokens=1), reranker=LexicalReranker())
+    yield qa_service
+    if qa_service.rerank_batcher:
+        qa_service.rerank_batcher.stop()
+    qa_service.cpu_pool.shutdown(wait=False)
+
+@pytest.mark.parametrize("error", [
+    asyncio.TimeoutError(), ConnectionResetError(), StatusError(429), StatusError("503"), ResourceExhausted(),
+])
+def test_transient_errors_are_retried(error):
+    assert _is_retryable_llm_error(error)
+
+@pytest.mark.parametrize("error", [ValueError("bad prompt"), StatusError(400), StatusError(None), KeyError("x")])
+def test_other_errors_are_not_retried(error):
+    assert not _is_retryable_llm_error(error)
+
+def test_llm_slot_is_released_while_backing_off(service, monkeypatch):
+    service.llm = FlakyLLM([ConnectionError("reset")])
+    monkeypatch.setattr(service, "_retry_delay", lambda attempt: 0.3)
+
+    async def scenario():
+        service.llm_slots = asyncio.Semaphore(1)
+        call = asyncio.create_task(service._ainvoke_llm([]))
+        await asyncio.sleep(0.1)
+        # The first attempt has failed and is sleeping; a fresh request must still get the only slot.
+        await asyncio.wait_for(service.llm_slots.acquire(), timeout=0.1)
+        service.llm_slots.release()
+        return await call
+
+    assert asyncio.run(scenario()) == "ok"
+    assert service.llm.calls == 2
+
+def test_non_retryable_errors_fail_without_retrying(service, monkeypatch):
+    service.llm = FlakyLLM([ValueError("bad prompt")])
+    monkeypatch.setattr(service, "_retry_delay", lambda attempt: 0)
+
+    async def scenario():
+        service.llm_slots = asyncio.Semaphore(1)
+        with pytest.raises(ValueError):
+            await service._ainvoke_llm([])
+        return service.llm_slots.locked()
+
+    assert asyncio.run(scenario()) is False
+    assert service.llm.calls == 1
+
+def test_retries_stop_after_the_configured_attempts(service, monkeypatch):
+    monkeypatch.setattr("app.services.qa_service.settings.LLM_MAX_RETRIES", 2)
+    service.llm = FlakyLLM([StatusError(503)] * 5)
+    monkeypatch.setattr(service, "_retry_delay", lambda attempt: 0)
+
+    async def scenario():
+        service.llm_slots = asyncio.Semaphore(1)
+        await service._ainvoke_llm([])
+
+    with pytest.raises(StatusError):
+        asyncio.run(scenario())
+    assert service.llm.calls == 3
+
+def test_batched_rerank_does_not_need_a_query_pool_thread(service):
+    assert service.rerank_batcher is not None
+    docs = [Document(page_content=text) for text in ["apples and pears", "apples", "bananas"]]
+    gate = threading.Event()
+    service.cpu_pool = ThreadPoolExecutor(max_workers=1)
+    service.cpu_pool.submit(gate.wait, 5)
+
+    async def scenario():
+        # Every query-pool thread is busy, yet reranking still completes from the event loop.
+        reranks = asyncio.gather(*(service._arerank_candidates("apples pears", docs, 2) for _ in range(8)))
+        return await asyncio.wait_for(reranks, timeout=2)
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        gate.set()
+    for scored in results:
+        assert [doc.page_content for _, doc in scored] == ["apples and pears", "apples"]
+        assert all(score is not None for score, _ in scored)
+
+def _embedded(embedding_service, *texts):
+    document_id = str(uuid.uuid4())
+    chunks = [Document(page_content=text, metadata={"document_name": f"{document_id}.txt", "page_number": 1}) for text in texts]
+    embedding_service.embed_and_store_chunks(document_id, chunks)
+    return document_id
+
+def _doc(text, chunk_hash=None):
+    return Document(page_content=text, metadata={"chunk_hash": chunk_hash} if chunk_hash else {})
+
+@pytest.mark.parametrize("prefix", [[], ["known"]])
+def test_unknown_ids_fail_the_query(service, embedding_service, prefix):
+    known = [_embedded(embedding_service, "apples and pears") for _ in prefix]
+    with pytest.raises(DocumentNotFoundError) as excinfo:
+        asyncio.run(service.aprepare_multi_query("apples", known + ["ghost"]))
+    assert excinfo.value.status_code == 404
+    assert "ghost" in excinfo.value.detail
+    assert not any(document_id in excinfo.value.detail for document_id in known)
+
+def test_collection_skips_unsearchable_members_with_a_warning(service, embedding_service, caplog):
+    document_id = _embedded(embedding_service, "apples and pears", "bananas")
+    with caplog.at_level(logging.WARNING, logger="app.services.qa_service"):
+        prepared = asyncio.run(service.aprepare_multi_query("apples", [document_id, "ghost"], skip_missing=True))
+    assert {doc.metadata["document_id"] for doc in prepared.context_docs} == {document_id}
+    assert "ghost" in caplog.text
+
+def test_collection_with_no_searchable_member_fails(service):
+    with pytest.raises(DocumentNotFoundError):
+        asyncio.run(service.aprepare_multi_query("apples", ["ghost", "phantom"], skip_missing=True))
+
+def test_merge_interleaves_by_rank_and_drops_duplicate_chunks(service):
+    merged = service._merge_candidates([
+        [_doc("a1"), _doc("a2", "shared"), _doc("a3")],
+        [_doc("b1"), _doc("b2", "shared")],
+    ])
+    assert [doc.page_content for doc in merged] == ["a1", "b1", "a2", "a3"]
+
+def test_merge_stops_at_the_candidate_limit(service, monkeypatch):
+    monkeypatch.setattr("app.services.qa_service.settings.MULTI_DOC_MAX_CANDIDATES", 3)
+    merged = service._merge_candidates([[_doc(f"a{i}") for i in range(5)], [_doc(f"b{i}") for i in range(5)]])
+    assert [doc.page_content for doc in merged] == ["a0", "b0", "a1"]
@@ -0,0 +1,66 @@
+import threading
+import pytest
+from app.services.rerank_batcher import RerankBatcher
+
+class LengthReranker:
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        self.calls.append(len(pairs))
+        return [float(len(passage)) for _, passage in pairs]
+
+def _batcher(reranker, max_wait_ms=1):
+    return RerankBatcher(reranker=reranker, max_batch_pairs=64, max_wait_ms=max_wait_ms, predict_batch_size=32)
+
+def test_scores_are_returned_per_request():
+    batcher = _batcher(LengthReranker())
+    try:
+        assert batcher.score([("q", "ab"), ("q", "abcd")]) == [2.0, 4.0]
+    finally:
+        batcher.stop()
+
+def test_concurrent_requests_share_a_batch():
+    reranker = LengthReranker()
+    batcher = _batcher(reranker, max_wait_ms=200)
+    try:
+        futures = [batcher.submit([("q", "x" * i)]) for i in range(1, 4)]
+        assert [future.result(timeout=5) for future in futures] == [[1.0], [2.0], [3.0]]
+        assert reranker.calls == [3]
+    finally:
+        batcher.stop()
+
+def test_submit_after_stop_raises():
+    batcher = _batcher(LengthReranker())
+    batcher.stop()
+    with pytest.raises(RuntimeError):
+        batcher.submit([("q", "p")])
+
+def test_stop_fails_requests_the_worker_never_reached():
+    gate = threading.Event()
+    batcher = _batcher(LengthReranker(gate=gate))
+    batcher.STOP_JOIN_SECONDS = 0.05
+    first = batcher.submit([("q", "busy")])
+    # Give the worker time to pick up the first request and block inside predict().
+    threading.Event().wait(0.05)
+    queued = batcher.submit([("q", "waiting")])
+    batcher.stop()
+    with pytest.raises(RuntimeError):
+        queued.result(timeout=1)
+    gate.set()
+    assert first.result(timeout=5) == [4.0]
+    batcher._thread.join(timeout=5)
+    assert not batcher._thread.is_alive()
+
+def test_score_times_out_instead_of_blocking():
+    gate = threading.Event()
+    batcher = _batcher(LengthReranker(gate=gate))
+    try:
+        with pytest.raises(TimeoutError):
+            batcher.score([("q", "slow")], timeout=0.05)
+    finally:
+        gate.set()
+        batcher.stop()